@@ -13,6 +13,10 @@ from extensions import mongo
 # Core components
 from core.logger import setup_logging
 from core.module_registry import registry
+from core.cli import init_cli
+from core.json_provider import init_json
+from core.templating import init_templating
+from utils.email_utils import init_email
 
 # Existing modules
 from auth.routes import auth_bp
@@ -31,6 +35,8 @@ def create_app(config_class=Config):
     """
     app = Flask(__name__)
     app.config.from_object(config_class)
+    init_json(app)
+    init_email(app)
 
     # Setup logging
     setup_logging(app)
@@ -41,7 +47,15 @@ def create_app(config_class=Config):
     os.makedirs(upload_folder, exist_ok=True)
 
     # Initialize extensions
-    mongo.init_app(app)
+    mongo.init_app(
+        app,
+        compressors=app.config.get("MONGO_COMPRESSORS"),
+        maxPoolSize=app.config.get("MONGO_MAX_POOL_SIZE", 50),
+        minPoolSize=app.config.get("MONGO_MIN_POOL_SIZE", 5),
+        socketTimeoutMS=app.config.get("MONGO_SOCKET_TIMEOUT_MS", 30000),
+    )
+    # Migrations and indexes are applied by `flask init-db`, run once per deploy
+    init_cli(app)
 
     # Register core blueprints
     app.register_blueprint(auth_bp)
@@ -53,6 +67,15 @@ def create_app(config_class=Config):
     registry.register_all_blueprints(app)
     registry.initialize_all_modules(app)
 
+    # Template globals (memoized url_for)
+    init_templating(app)
+
+    # Compile member templates up front and size Jinja's cache so they
+    # (and their included sub-templates) are never evicted and re-parsed
+    app.jinja_env.cache_size = 400
+    for name in app.jinja_env.list_templates(filter_func=lambda n: n.startswith("member/")):
+        app.jinja_env.get_template(name)
+
     # Error handlers
     @app.errorhandler(404)
     def not_found(error):
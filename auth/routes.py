@@ -7,6 +7,7 @@ from flask import Blueprint, render_template, request, redirect, url_for, sessio
 from werkzeug.security import generate_password_hash, check_password_hash
 
 from extensions import mongo
+from core.cache import user_emails_cache, users_cache
 from bson.objectid import ObjectId
 
 auth_bp = Blueprint("auth", __name__, template_folder="../templates/auth")
@@ -25,7 +26,7 @@ def allowed_file(filename):
 def register():
     if request.method == "POST":
         name = request.form.get("name")
-        email = request.form.get("email").lower()
+        email = request.form.get("email").strip().lower()
         phone = request.form.get("phone")
         password = request.form.get("password")
         confirm = request.form.get("confirm")
@@ -67,6 +68,8 @@ def register():
             user_doc["project_ids"] = [ObjectId(pid) for pid in project_ids]
 
         mongo.db.users.insert_one(user_doc)
+        users_cache.invalidate()
+        user_emails_cache.invalidate(email)
 
         flash("Registration successful. Please login.", "success")
         return redirect(url_for("auth.login"))
@@ -80,7 +83,7 @@ def register():
 @auth_bp.route("/login", methods=["GET", "POST"])
 def login():
     if request.method == "POST":
-        email = request.form.get("email").lower()
+        email = request.form.get("email").strip().lower()
         password = request.form.get("password")
 
         user = mongo.db.users.find_one({"email": email})
@@ -112,7 +115,7 @@ def logout():
 def forgot_password():
     """Forgot password - requires privilege key for managers"""
     if request.method == "POST":
-        email = request.form.get("email").lower()
+        email = request.form.get("email").strip().lower()
         role = request.form.get("role")
         manager_key = request.form.get("manager_key", "")
         
@@ -154,7 +157,7 @@ def forgot_password():
         
         # Try to send email
         try:
-            from utils.email_utils import send_email
+            from utils.email_utils import send_email_async
             
             subject = "Password Reset Request - Shift Scheduler"
             email_body = f"""
@@ -173,7 +176,8 @@ Best regards,
 Shift Scheduler Team
 """
             
-            email_sent = send_email(email, subject, email_body)
+            # Sent in the background; False only if SMTP isn't configured
+            email_sent = send_email_async(email, subject, email_body)
             
             if email_sent:
                 flash("Password reset link has been sent to your email address. Please check your inbox.", "success")
@@ -233,6 +237,7 @@ def reset_password(token):
             {"_id": user["_id"]},
             {"$set": {"password_hash": password_hash}}
         )
+        user_emails_cache.invalidate(user["email"])
         
         # Mark token as used
         mongo.db.password_reset_tokens.update_one(
@@ -292,6 +297,8 @@ def upload_profile_picture():
             {"_id": user_id},
             {"$set": {"profile_picture": filename}}
         )
+        users_cache.invalidate("profiles")
+        user_emails_cache.invalidate(user["email"])
         
         return jsonify({"success": True, "message": "Profile picture updated successfully!", "filename": filename})
     except Exception as e:
@@ -13,6 +13,13 @@ class Config:
     # MongoDB connection
     # ------------------------------------------------------------------
     MONGO_URI = os.environ.get("MONGO_URI") or "mongodb://localhost:27017/shift_scheduler_db"
+    # Wire compression; zlib needs no extra package (snappy/zstd do)
+    MONGO_COMPRESSORS = os.environ.get("MONGO_COMPRESSORS", "zlib")
+    # The app shares one client; keep a few warm connections so requests
+    # don't pay the TCP/TLS handshake after idle periods
+    MONGO_MAX_POOL_SIZE = int(os.environ.get("MONGO_MAX_POOL_SIZE", 50))
+    MONGO_MIN_POOL_SIZE = int(os.environ.get("MONGO_MIN_POOL_SIZE", 5))
+    MONGO_SOCKET_TIMEOUT_MS = int(os.environ.get("MONGO_SOCKET_TIMEOUT_MS", 30000))
 
     # ------------------------------------------------------------------
     # Email / SMTP settings (optional)
@@ -45,5 +52,9 @@ class Config:
     # Rate limiting (can be implemented with Flask-Limiter)
     RATELIMIT_ENABLED = os.environ.get("RATELIMIT_ENABLED", "False").lower() == "true"
     
+    # Compiled Jinja templates are cached here across worker restarts
+    # (set to an empty string to disable)
+    JINJA_BYTECODE_CACHE_DIR = os.environ.get("JINJA_BYTECODE_CACHE_DIR", "/tmp/jinja_cache")
+
     # Logging
     LOG_LEVEL = os.environ.get("LOG_LEVEL", "INFO")
\ No newline at end of file
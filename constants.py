@@ -13,16 +13,18 @@ SHIFT_COLORS = {
     "L": "#dc3545",  # Red (Leave)
 }
 
+# shift code -> (start, end)
 SHIFT_TIMES = {
-    "A": {"start": "09:00", "end": "17:00"},
-    "B": {"start": "17:00", "end": "01:00"},
-    "C": {"start": "21:00", "end": "05:00"},
-    "G": {"start": "06:00", "end": "14:00"},
-    "W": {"start": "00:00", "end": "23:59"},  # Weekoff - all day
-    "L": {"start": "00:00", "end": "23:59"},  # Leave - all day
+    "A": ("09:00", "17:00"),
+    "B": ("17:00", "01:00"),
+    "C": ("21:00", "05:00"),
+    "G": ("06:00", "14:00"),
+    "W": ("00:00", "23:59"),  # Weekoff - all day
+    "L": ("00:00", "23:59"),  # Leave - all day
 }
+DEFAULT_SHIFT_TIMES = ("09:00", "17:00")
 
-VALID_SHIFT_CODES = ["A", "B", "C", "G", "W", "L"]
+VALID_SHIFT_CODES = frozenset({"A", "B", "C", "G", "W", "L"})
 
 # User roles
 ROLES = {
@@ -30,7 +32,7 @@ ROLES = {
     "MEMBER": "member",
 }
 
-VALID_ROLES = list(ROLES.values())
+VALID_ROLES = frozenset(ROLES.values())
 
 # File upload settings
 ALLOWED_IMAGE_EXTENSIONS = {"png", "jpg", "jpeg", "gif"}
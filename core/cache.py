@@ -0,0 +1,126 @@
+"""
+Small in-process caches for lookup data that is read on most requests
+but changes rarely (user names, project names).
+"""
+
+import threading
+import time
+from typing import Any, Callable, Dict, Hashable, Optional
+
+from extensions import mongo
+
+
+class TTLCache:
+    """
+    Thread-safe key/value cache whose entries expire after `ttl` seconds.
+    When more than `maxsize` entries are stored the oldest one is evicted.
+    """
+
+    def __init__(self, ttl: float, maxsize: int = 128):
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self._data = {}
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """Return the cached value for key, or default if missing/expired."""
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return default
+            expires_at, value = entry
+            if expires_at < time.monotonic():
+                del self._data[key]
+                return default
+            return value
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None) -> None:
+        """Store value under key for `ttl` seconds (the cache's ttl by default)."""
+        with self._lock:
+            if key not in self._data and len(self._data) >= self.maxsize:
+                oldest = min(self._data, key=lambda k: self._data[k][0])
+                del self._data[oldest]
+            self._data[key] = (time.monotonic() + (self.ttl if ttl is None else ttl), value)
+
+    def get_or_set(self, key: Hashable, factory: Callable[[], Any]) -> Any:
+        """Return the cached value for key, computing and storing it on a miss."""
+        _missing = object()
+        value = self.get(key, _missing)
+        if value is _missing:
+            value = factory()
+            self.set(key, value)
+        return value
+
+    def invalidate(self, key: Optional[Hashable] = None) -> None:
+        """Drop one key, or every key when called without arguments."""
+        with self._lock:
+            if key is None:
+                self._data.clear()
+            else:
+                self._data.pop(key, None)
+
+
+# Lookup maps derived from the users collection; cleared on user writes
+users_cache = TTLCache(ttl=30)
+
+# Lookup maps derived from the projects collection; cleared on project writes
+projects_cache = TTLCache(ttl=60)
+
+# Per-member project ids (membership + projects of their shifts)
+membership_cache = TTLCache(ttl=30, maxsize=4096)
+
+# Gzipped team calendar feeds per (member, visible window)
+team_events_cache = TTLCache(ttl=15, maxsize=1024)
+
+# User documents (minus password_hash) by normalized email; evicted on writes
+# through UserService and on direct users updates in the routes.
+# Emails with no user are remembered for NO_USER_TTL seconds as NO_USER
+user_emails_cache = TTLCache(ttl=300, maxsize=4096)
+NO_USER = object()
+NO_USER_TTL = 30
+
+# Per-user notification reads, {(unread_only, limit): [...]} per user id
+notifications_cache = TTLCache(ttl=5, maxsize=10000)
+
+
+def user_names() -> Dict[str, str]:
+    """
+    Map str(user_id) -> name for every user, cached for a few seconds.
+    """
+    return users_cache.get_or_set(
+        "names",
+        lambda: {
+            str(u["_id"]): u.get("name", "Unknown")
+            for u in mongo.db.users.find({}, {"name": 1})
+        },
+    )
+
+
+def user_profiles() -> Dict[str, Dict[str, str]]:
+    """
+    Map str(user_id) -> {"name", "profile_pic"} for every user, cached for a
+    few seconds. Used by the calendar feeds that show avatars.
+    """
+    return users_cache.get_or_set(
+        "profiles",
+        lambda: {
+            str(u["_id"]): {
+                "name": u.get("name", "Unknown"),
+                "profile_pic": u.get("profile_picture", "default.png"),
+            }
+            for u in mongo.db.users.find({}, {"name": 1, "profile_picture": 1})
+        },
+    )
+
+
+def project_names() -> Dict[str, str]:
+    """
+    Map str(project_id) -> name for every project, cached for a minute.
+    """
+    return projects_cache.get_or_set(
+        "names",
+        lambda: {
+            str(p["_id"]): p.get("name", "General")
+            for p in mongo.db.projects.find({}, {"name": 1})
+        },
+    )
@@ -0,0 +1,46 @@
+"""
+Flask CLI commands for database setup.
+Migrations and index builds run here, as a deploy step, instead of inside
+create_app:
+every worker boot would otherwise make blocking round trips to MongoDB
+and hang for the server-selection timeout when it is unreachable.
+"""
+
+import click
+
+from extensions import mongo
+from core.indexes import ensure_indexes
+from core.migrations import dedupe_shifts, find_duplicate_shifts, run_migrations
+
+
+def init_cli(app) -> None:
+    """Register the database CLI commands on app."""
+
+    @app.cli.command("init-db")
+    def init_db():
+        """Run data migrations, then create indexes; exits non-zero on failure."""
+        try:
+            run_migrations(mongo.db)
+            ensure_indexes(mongo.db)
+        except Exception as e:
+            raise click.ClickException(str(e))
+        click.echo("Migrations applied and indexes are up to date.")
+
+    @app.cli.command("dedupe-shifts")
+    @click.option("--yes", is_flag=True, help="Delete the older duplicates instead of listing them.")
+    def dedupe_shifts_command(yes):
+        """List shifts sharing a (user_id, date); with --yes keep the newest of each and delete the rest."""
+        groups = find_duplicate_shifts(mongo.db)
+        if not groups:
+            click.echo("No duplicate shifts.")
+            return
+        for group in groups:
+            click.echo(
+                f"user {group['_id'].get('user_id')} on {group['_id'].get('date')}: "
+                f"keep {group['ids'][0]}, delete {', '.join(str(i) for i in group['ids'][1:])}"
+            )
+        if not yes:
+            click.echo(f"{len(groups)} duplicate groups; re-run with --yes to delete the older shifts.")
+            return
+        deleted = dedupe_shifts(mongo.db)
+        click.echo(f"Deleted {deleted} duplicate shifts.")
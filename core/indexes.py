@@ -0,0 +1,90 @@
+"""
+MongoDB index definitions.
+Indexes are created by the `flask init-db` deploy step so the hot queries
+in the blueprints can be served by index scans instead of collection scans.
+"""
+
+from pymongo import ASCENDING, DESCENDING
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+_PENDING_RECENT = {
+    "name": "pending_recent",
+    "partialFilterExpression": {"status": "pending"},
+}
+
+# collection name -> list of (keys, options)
+INDEXES = {
+    "shifts": [
+        # One shift per user per date; also serves every (user_id, date) lookup.
+        # Shift writes rely on it to reject double-booking (DuplicateKeyError),
+        # so init-db fails if it can't be built; the dedupe migration runs first
+        ([("user_id", ASCENDING), ("date", ASCENDING)], {"unique": True, "name": "user_date_uniq"}),
+        # Project/day views, optionally narrowed or ordered by shift code.
+        # Shifts without a project (unlinked by project deletion) are left out
+        ([("project_id", ASCENDING), ("date", ASCENDING), ("shift_code", ASCENDING)], {
+            "name": "project_date_code",
+            "partialFilterExpression": {"project_id": {"$exists": True}},
+        }),
+        # Covers the per-member "which projects do my shifts belong to" lookup
+        ([("user_id", ASCENDING), ("project_id", ASCENDING)], {}),
+        # Manager-wide views filter or sort on date alone; the shift code
+        # suffix also serves the date-then-code ordering of planned shifts
+        ([("date", ASCENDING), ("shift_code", ASCENDING)], {}),
+    ],
+    "shift_logs": [
+        # Handover pages read one project/day newest first; no in-memory sort
+        ([("project_id", ASCENDING), ("date", ASCENDING), ("created_at", DESCENDING)], {}),
+    ],
+    "users": [
+        # Login/lookup by email; registration already rejects duplicates
+        ([("email", ASCENDING)], {"unique": True, "name": "email_uniq"}),
+        # Role listings use the role prefix; project membership filters add project_ids
+        ([("role", ASCENDING), ("project_ids", ASCENDING)], {}),
+        # Project member lookups without a role ($lookup on foreignField project_ids)
+        ([("project_ids", ASCENDING)], {}),
+        # Swap-target autocomplete scans member names by prefix
+        ([("role", ASCENDING), ("name", ASCENDING)], {}),
+    ],
+    "notifications": [
+        ([("user_id", ASCENDING), ("read", ASCENDING), ("created_at", DESCENDING)], {}),
+        # Latest notifications for a user regardless of read state
+        ([("user_id", ASCENDING), ("created_at", DESCENDING)], {}),
+    ],
+    # Manager review pages list pending requests newest first
+    "shift_change_requests": [
+        ([("status", ASCENDING), ("created_at", DESCENDING)], _PENDING_RECENT),
+    ],
+    "shift_swap_requests": [
+        ([("status", ASCENDING), ("created_at", DESCENDING)], _PENDING_RECENT),
+    ],
+    "leave_requests": [
+        ([("status", ASCENDING), ("created_at", DESCENDING)], _PENDING_RECENT),
+    ],
+}
+
+
+def ensure_indexes(db):
+    """
+    Create all indexes declared in INDEXES.
+    create_index is a no-op for indexes that already exist, so this is safe
+    to run on every deploy. Every index is attempted; if any fails, a
+    RuntimeError naming them is raised afterwards so the deploy step fails
+    instead of the app running without them.
+    """
+    if db is None:
+        raise RuntimeError("MongoDB is not configured")
+
+    failed = []
+    for collection, indexes in INDEXES.items():
+        for keys, options in indexes:
+            try:
+                db[collection].create_index(keys, **options)
+            except Exception as e:
+                logger.error(f"Could not create index {keys} on {collection}: {str(e)}")
+                failed.append(f"{collection} {options.get('name', keys)}")
+
+    if failed:
+        raise RuntimeError(f"Could not create indexes: {', '.join(failed)}")
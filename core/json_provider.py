@@ -0,0 +1,131 @@
+"""
+Fast JSON serialization for API responses.
+When orjson is installed, jsonify() serializes through it instead of the
+stdlib json module; otherwise Flask's default provider is kept.
+"""
+
+import gzip
+import json
+import logging
+
+from flask import Response, request, stream_with_context
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+# Marks an empty iterable in stream_json_array
+_END = object()
+
+
+class OrjsonProvider(DefaultJSONProvider):
+    """
+    JSON provider backed by orjson.
+    Types orjson can't encode natively (ObjectId, Decimal, ...) fall back to
+    the same conversions Flask's default provider uses, then str().
+    """
+
+    # Datetimes go through _fallback so they keep Flask's HTTP-date format
+    option = (
+        orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME
+        if ORJSON_AVAILABLE else 0
+    )
+
+    @staticmethod
+    def _fallback(o):
+        try:
+            return DefaultJSONProvider.default(o)
+        except TypeError:
+            return str(o)
+
+    def dumps(self, obj, **kwargs):
+        return orjson.dumps(obj, default=self._fallback, option=self.option).decode()
+
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(
+            orjson.dumps(obj, default=self._fallback, option=self.option),
+            mimetype=self.mimetype,
+        )
+
+
+def init_json(app):
+    """Install OrjsonProvider on app when orjson is available."""
+    if ORJSON_AVAILABLE:
+        app.json = OrjsonProvider(app)
+
+
+def _dumps_bytes(obj) -> bytes:
+    if ORJSON_AVAILABLE:
+        return orjson.dumps(obj, default=OrjsonProvider._fallback, option=OrjsonProvider.option)
+    return json.dumps(obj, default=str).encode()
+
+
+def gzip_json_array(items, compresslevel: int = 6) -> bytes:
+    """Encode an iterable as a JSON array and gzip it, for caching."""
+    return gzip.compress(_dumps_bytes(list(items)), compresslevel=compresslevel)
+
+
+def gzipped_json_response(body: bytes) -> Response:
+    """
+    Response for a body produced by gzip_json_array. Sent as-is with
+    Content-Encoding: gzip when the client accepts it, decompressed otherwise.
+    """
+    if "gzip" in request.accept_encodings:
+        response = Response(body, mimetype="application/json")
+        response.headers["Content-Encoding"] = "gzip"
+    else:
+        response = Response(gzip.decompress(body), mimetype="application/json")
+    response.vary.add("Accept-Encoding")
+    return response
+
+
+def _close(items) -> None:
+    close = getattr(items, "close", None)
+    if close:
+        close()
+
+
+def stream_json_array(items) -> Response:
+    """
+    Stream an iterable of JSON-serializable items as a JSON array response.
+    Items are encoded one at a time as they are produced (e.g. from a Mongo
+    cursor), so the full list is never held in memory. The request context
+    stays available to the producer (for logging, url_for, ...) while the
+    response streams.
+
+    The first item is fetched before returning, so a failing query raises
+    here, inside the caller's error handling, rather than after a 200 has
+    been sent. An error later in the stream is logged and the array is
+    closed, so the client still receives valid JSON.
+    """
+    iterator = iter(items)
+    try:
+        first = next(iterator, _END)
+    except Exception:
+        _close(items)
+        raise
+
+    def generate():
+        try:
+            yield b"["
+            if first is not _END:
+                yield _dumps_bytes(first)
+                try:
+                    for item in iterator:
+                        yield b"," + _dumps_bytes(item)
+                except Exception as e:
+                    logger.error(f"JSON stream ended early after an error: {str(e)}")
+            yield b"]"
+        finally:
+            _close(items)
+
+    return Response(stream_with_context(generate()), mimetype="application/json")
@@ -0,0 +1,104 @@
+"""
+One-shot data migrations, run by the `flask init-db` deploy step before
+indexes are built.
+Each migration is idempotent: it only touches documents still in the old
+shape, so running them on every deploy is cheap once the data is fixed.
+Each returns the number of documents it changed.
+"""
+
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Matches a 24-char hex ObjectId stored as a plain string
+_OBJECT_ID_STRING = {"$regex": "^[0-9a-fA-F]{24}$"}
+
+
+def _shift_logs_project_id_to_object_id(db):
+    """shift_logs.project_id used to be written as str(ObjectId)."""
+    return db.shift_logs.update_many(
+        {"project_id": _OBJECT_ID_STRING},
+        [{"$set": {"project_id": {"$toObjectId": "$project_id"}}}],
+    ).modified_count
+
+
+def find_duplicate_shifts(db):
+    """
+    Groups of shifts sharing a (user_id, date), which block the unique
+    user_date_uniq index. Each group's "ids" are newest first (by
+    updated_at, then created_at, then _id).
+    """
+    return list(db.shifts.aggregate([
+        {"$sort": {"updated_at": -1, "created_at": -1, "_id": -1}},
+        {"$group": {
+            "_id": {"user_id": "$user_id", "date": "$date"},
+            "ids": {"$push": "$_id"},
+            "count": {"$sum": 1},
+        }},
+        {"$match": {"count": {"$gt": 1}}},
+    ], allowDiskUse=True))
+
+
+def dedupe_shifts(db):
+    """
+    Keep the newest shift of each duplicate (user_id, date) group and
+    delete the rest. Destructive: only run from `flask dedupe-shifts --yes`
+    after reviewing the groups. Returns the number of shifts deleted.
+    """
+    stale_ids = []
+    for group in find_duplicate_shifts(db):
+        logger.warning(
+            f"Duplicate shifts for user {group['_id'].get('user_id')} on "
+            f"{group['_id'].get('date')}: keeping {group['ids'][0]}, removing {group['ids'][1:]}"
+        )
+        stale_ids.extend(group["ids"][1:])
+
+    if not stale_ids:
+        return 0
+    return db.shifts.delete_many({"_id": {"$in": stale_ids}}).deleted_count
+
+
+def _check_no_duplicate_shifts(db):
+    """
+    Double-booking is prevented only by the unique shifts (user_id, date)
+    index, which can't be built while duplicates exist. Report them and
+    stop the deploy; nothing is deleted here.
+    """
+    groups = find_duplicate_shifts(db)
+    for group in groups:
+        logger.error(
+            f"Duplicate shifts for user {group['_id'].get('user_id')} on "
+            f"{group['_id'].get('date')}: {group['ids']}"
+        )
+    if groups:
+        raise RuntimeError(
+            f"{len(groups)} (user_id, date) pairs have more than one shift; review them "
+            "and run `flask --app app dedupe-shifts` to resolve before deploying"
+        )
+    return 0
+
+
+MIGRATIONS = [
+    _shift_logs_project_id_to_object_id,
+    # Must run before ensure_indexes builds user_date_uniq
+    _check_no_duplicate_shifts,
+]
+
+
+def run_migrations(db):
+    """
+    Apply every migration in MIGRATIONS, in order.
+    A failure is logged and re-raised, so later migrations and the index
+    build don't run on data in an unexpected shape.
+    """
+    if db is None:
+        raise RuntimeError("MongoDB is not configured")
+
+    for migration in MIGRATIONS:
+        try:
+            changed = migration(db)
+        except Exception as e:
+            logger.error(f"Migration {migration.__name__} failed: {str(e)}")
+            raise
+        if changed:
+            logger.info(f"{migration.__name__}: migrated {changed} documents")
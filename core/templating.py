@@ -0,0 +1,47 @@
+"""
+Jinja helpers.
+url_for is exposed to templates through a memoized wrapper: building a URL
+walks the app's URL map, and templates emit the same links on every render.
+Compiled templates are kept in an on-disk bytecode cache shared by workers.
+"""
+
+import os
+from functools import lru_cache
+
+from flask import request, url_for
+from jinja2 import FileSystemBytecodeCache
+
+
+@lru_cache(maxsize=4096)
+def _url_for_cached(script_root, endpoint, items):
+    # script_root is part of the key because generated URLs are prefixed
+    # with it when the app is mounted under a sub-path
+    return url_for(endpoint, **dict(items))
+
+
+def cached_url_for(endpoint, **values):
+    """
+    Drop-in url_for for templates.
+    Blueprint-relative endpoints (".name") and external URLs depend on the
+    current request, and unhashable arguments can't be cache keys; those
+    fall through to the regular url_for.
+    """
+    if endpoint.startswith(".") or values.get("_external"):
+        return url_for(endpoint, **values)
+    try:
+        return _url_for_cached(request.script_root, endpoint, tuple(sorted(values.items())))
+    except TypeError:
+        return url_for(endpoint, **values)
+
+
+def init_templating(app):
+    """
+    Install the template helpers on app's Jinja environment, and the
+    bytecode cache when JINJA_BYTECODE_CACHE_DIR is set.
+    """
+    app.jinja_env.globals["url_for"] = cached_url_for
+
+    cache_dir = app.config.get("JINJA_BYTECODE_CACHE_DIR")
+    if cache_dir:
+        os.makedirs(cache_dir, exist_ok=True)
+        app.jinja_env.bytecode_cache = FileSystemBytecodeCache(cache_dir, "%s.cache")
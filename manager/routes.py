@@ -1,7 +1,10 @@
 import os
 import csv
 import io
-from datetime import datetime, timedelta
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from datetime import date, datetime, timedelta
 
 # Optional import for Excel support
 try:
@@ -24,24 +27,15 @@ from flask import (
 )
 from werkzeug.utils import secure_filename
 from bson.objectid import ObjectId
+from pymongo import UpdateOne, WriteConcern
+from pymongo.errors import BulkWriteError, DuplicateKeyError, PyMongoError
 
 from . import manager_bp
 from extensions import mongo
-
-
-# =========================================================
-# FILE UPLOAD HELPER (for profile picture)
-# =========================================================
-def allowed_file(filename):
-    """
-    Check if the uploaded file has an allowed extension.
-    Uses ALLOWED_EXTENSIONS from app config.
-    """
-    return (
-        "." in filename
-        and filename.rsplit(".", 1)[1].lower()
-        in current_app.config.get("ALLOWED_EXTENSIONS", set())
-    )
+from core.cache import notifications_cache, project_names, user_emails_cache, user_names, user_profiles, users_cache
+from core.json_provider import stream_json_array
+from utils.date_utils import IMPORT_DATE_FORMATS, next_day, parse_import_date
+from utils.image_utils import ALLOWED_IMAGE_TYPES, save_profile_picture, sniff_image_type
 
 
 # =========================================================
@@ -76,24 +70,94 @@ def manager_required(f):
 # =========================================================
 # SHIFT HELPERS
 # =========================================================
-def check_shift_conflict(user_id, date_str, exclude_shift_id=None):
+def _unacked_notifications():
     """
-    Check if a user already has a shift on the given date.
-    Returns (has_conflict, existing_shift) tuple.
+    Notifications collection handle with w=0 write concern.
+    Notifications are best-effort UI signals, so inserts don't wait for a
+    server ack; shift writes keep the default acknowledged concern.
     """
-    query = {
-        "user_id": ObjectId(user_id) if isinstance(user_id, str) else user_id,
-        "date": date_str,
-    }
-    existing_shift = mongo.db.shifts.find_one(query)
+    return mongo.db.notifications.with_options(write_concern=WriteConcern(w=0))
 
-    if existing_shift:
-        # If we're updating an existing shift, exclude it from conflict check
-        if exclude_shift_id and str(existing_shift["_id"]) == str(exclude_shift_id):
-            return False, None
-        return True, existing_shift
 
-    return False, None
+def _notify(*docs):
+    """
+    Insert notification documents unacknowledged and evict each recipient's
+    cached notification reads, so new ones show up on the next page load.
+    """
+    if not docs:
+        return
+    for doc in docs:
+        notifications_cache.invalidate(str(doc["user_id"]))
+    if len(docs) == 1:
+        _unacked_notifications().insert_one(docs[0])
+    else:
+        _unacked_notifications().insert_many(list(docs), ordered=False)
+
+
+# Shared pool for issuing independent writes to different collections at once
+_write_pool = ThreadPoolExecutor(max_workers=4, thread_name_prefix="mongo-write")
+
+
+def _run_concurrently(*calls):
+    """
+    Run independent zero-argument callables on the write pool and wait for
+    all of them, so their round trips overlap. Re-raises the first failure.
+    """
+    futures = [_write_pool.submit(call) for call in calls]
+    return [f.result() for f in futures]
+
+
+# Max queued operations per collection before an import flushes to MongoDB
+IMPORT_BATCH_SIZE = 1000
+
+# Excel text cells accept the pasted-data formats except dd.mm.yyyy
+EXCEL_DATE_FORMATS = IMPORT_DATE_FORMATS[:-1]
+
+
+def _flush_import_ops(shift_ops, notif_ops, op_rows, errors):
+    """
+    Write queued import operations as unordered bulk writes and clear the queues.
+    The three queues are parallel: shift_ops[i] and the notification
+    document notif_ops[i] come from
+    sheet row op_rows[i]. Rows whose shift write failed are reported in
+    errors and get no notification.
+    Returns (shifts written, rows failed).
+    """
+    if not shift_ops:
+        return 0, 0
+
+    failed = set()
+    try:
+        try:
+            result = mongo.db.shifts.bulk_write(shift_ops, ordered=False)
+            written = result.upserted_count + result.matched_count
+        except BulkWriteError as e:
+            # Unordered: every op without a write error was applied
+            details = e.details
+            written = details.get("nUpserted", 0) + details.get("nMatched", 0)
+            for err in details.get("writeErrors", []):
+                failed.add(err["index"])
+                errors.append(f"Row {op_rows[err['index']]}: {err.get('errmsg', 'could not be saved')}")
+        except PyMongoError as e:
+            # No result to tell which ops were applied before the failure
+            current_app.logger.error(f"Error writing imported shifts: {str(e)}")
+            errors.append(
+                f"Rows {op_rows[0]}-{op_rows[-1]}: could not be saved ({str(e)}); "
+                "some of them may have been applied, check the calendar"
+            )
+            return 0, len(shift_ops)
+
+        notifications = [op for i, op in enumerate(notif_ops) if i not in failed]
+        if notifications:
+            try:
+                _notify(*notifications)
+            except PyMongoError as e:
+                current_app.logger.error(f"Error sending import notifications: {str(e)}")
+        return written, len(failed)
+    finally:
+        shift_ops.clear()
+        notif_ops.clear()
+        op_rows.clear()
 
 
 # Color map for calendar events by shift code
@@ -105,6 +169,13 @@ SHIFT_COLORS = {
     "W": "#6c757d",  # gray (weekoff)
     "L": "#dc3545",  # red (leave)
 }
+DEFAULT_COLOR = "#0dcaf0"
+
+# Fields the calendar feed, exports and shift-wise view actually read
+SHIFT_FIELDS = {
+    "date": 1, "shift_code": 1, "start_time": 1, "end_time": 1,
+    "user_id": 1, "project_id": 1, "task": 1,
+}
 
 # OFFICIAL SHIFT TIMINGS (24-hour format)
 SHIFT_TIMINGS = {
@@ -116,6 +187,23 @@ SHIFT_TIMINGS = {
     "L": ("00:00", "23:59"),  # Leave - all day
 }
 
+# Import header aliases (lowercased) → column role for Excel/paste uploads
+_HEADER_ALIASES = {
+    "date": "date",
+    "shift date": "date",
+    "member": "member",
+    "member name": "member",
+    "name": "member",
+    "email": "member",
+    "member email": "member",
+    "project": "project",
+    "project name": "project",
+    "shift": "shift",
+    "shift code": "shift",
+    "task": "task",
+    "task name": "task",
+}
+
 
 # =========================================================
 # MANAGER DASHBOARD
@@ -123,18 +211,23 @@ SHIFT_TIMINGS = {
 @manager_bp.route("/dashboard", methods=["GET"], endpoint="dashboard")
 @manager_required
 def dashboard():
-    users_count = mongo.db.users.count_documents({})
-    shifts_count = mongo.db.shifts.count_documents({})
-    project_count = mongo.db.projects.count_documents({})
-    pending_change = mongo.db.shift_change_requests.count_documents(
-        {"status": "pending"}
-    )
+    # Unfiltered totals come from collection metadata, not a scan
+    users_count = mongo.db.users.estimated_document_count()
+    shifts_count = mongo.db.shifts.estimated_document_count()
+    project_count = mongo.db.projects.estimated_document_count()
+    # The planner answers these from the partial pending_recent index
+    pending_change = mongo.db.shift_change_requests.count_documents({"status": "pending"})
     pending_swap = mongo.db.shift_swap_requests.count_documents({"status": "pending"})
 
     projects = list(mongo.db.projects.find().sort("created_at", -1))
+
+    # Per-project counts in one grouped pass per collection, not two per project
+    count_by_project = [{"$group": {"_id": "$project_id", "n": {"$sum": 1}}}]
+    shift_counts = {row["_id"]: row["n"] for row in mongo.db.shifts.aggregate(count_by_project)}
+    task_counts = {row["_id"]: row["n"] for row in mongo.db.project_tasks.aggregate(count_by_project)}
     for p in projects:
-        p["shift_count"] = mongo.db.shifts.count_documents({"project_id": p["_id"]})
-        p["task_count"] = mongo.db.project_tasks.count_documents({"project_id": p["_id"]})
+        p["shift_count"] = shift_counts.get(p["_id"], 0)
+        p["task_count"] = task_counts.get(p["_id"], 0)
 
     return render_template(
         "manager/dashboard.html",
@@ -153,13 +246,14 @@ def dashboard():
 @manager_bp.route("/auto-roster", methods=["POST"], endpoint="auto_roster")
 @manager_required
 def auto_roster():
-    start_date_str = request.form.get("start_date")
-    end_date_str = request.form.get("end_date")
-    project_id = request.form.get("project_id") or None
+    form = request.form
+    start_date_str = form.get("start_date")
+    end_date_str = form.get("end_date")
+    project_id = form.get("project_id") or None
 
     try:
-        start_date = datetime.strptime(start_date_str, "%Y-%m-%d").date()
-        end_date = datetime.strptime(end_date_str, "%Y-%m-%d").date()
+        start_date = date.fromisoformat(start_date_str)
+        end_date = date.fromisoformat(end_date_str)
     except (TypeError, ValueError):
         flash("Invalid date range", "danger")
         return redirect(url_for("manager.dashboard"))
@@ -176,6 +270,7 @@ def auto_roster():
     member_ids = [m["_id"] for m in members]
     idx = 0
 
+    now = datetime.utcnow()
     day = start_date
     while day <= end_date:
         date_str = day.isoformat()
@@ -186,7 +281,7 @@ def auto_roster():
             idx += 1
 
             existing_shift = mongo.db.shifts.find_one(
-                {"date": date_str, "user_id": user_id}
+                {"date": date_str, "user_id": user_id}, {"_id": 1}
             )
 
             doc = {
@@ -196,7 +291,7 @@ def auto_roster():
                 "start_time": start_t,
                 "end_time": end_t,
                 "task": f"{shift_code} shift",
-                "updated_at": datetime.utcnow(),
+                "updated_at": now,
             }
             if project_id:
                 doc["project_id"] = ObjectId(project_id)
@@ -209,8 +304,16 @@ def auto_roster():
                     {"$set": doc},
                 )
             else:
-                doc["created_at"] = datetime.utcnow()
-                mongo.db.shifts.insert_one(doc)
+                doc["created_at"] = now
+                try:
+                    mongo.db.shifts.insert_one(doc)
+                except DuplicateKeyError:
+                    # Created concurrently since the pre-read; update it instead
+                    doc.pop("created_at")
+                    mongo.db.shifts.update_one(
+                        {"user_id": user_id, "date": date_str},
+                        {"$set": doc},
+                    )
 
         day += timedelta(days=1)
 
@@ -235,68 +338,75 @@ def api_shifts():
         project_id = request.args.get("project_id")
 
         if user_id:
-            try:
-                query["user_id"] = ObjectId(user_id)
-            except:
+            if not ObjectId.is_valid(user_id):
                 return jsonify({"error": "Invalid user_id"}), 400
+            query["user_id"] = ObjectId(user_id)
         if project_id:
-            try:
-                query["project_id"] = ObjectId(project_id)
-            except:
+            if not ObjectId.is_valid(project_id):
                 return jsonify({"error": "Invalid project_id"}), 400
-
-        shifts_cursor = mongo.db.shifts.find(query).sort("date", 1)
-
-        users_list = list(mongo.db.users.find())
-        users_map = {str(u["_id"]): {"name": u.get("name", "Unknown"), "profile_pic": u.get("profile_picture", "default.png")} for u in users_list}
-        projects_map = {str(p["_id"]): p["name"] for p in mongo.db.projects.find()}
-
-        events = []
-        for s in shifts_cursor:
-            try:
-                date_str = s.get("date")  # "YYYY-MM-DD"
-                if not date_str:
-                    continue
-                    
-                start_time = s.get("start_time") or "09:00"
-                end_time = s.get("end_time") or "17:00"
-                shift_code = s.get("shift_code", "")
-
+            query["project_id"] = ObjectId(project_id)
+
+        shifts_cursor = mongo.db.shifts.find(query, SHIFT_FIELDS).sort("date", 1)
+
+        users_map = user_profiles()
+        projects_map = project_names()
+
+        def iter_events():
+            # Bind loop invariants to locals once instead of per shift
+            get_color = SHIFT_COLORS.get
+            get_user = users_map.get
+            get_project = projects_map.get
+            unknown_user = {"name": "Unknown", "profile_pic": "default.png"}
+            # Users and projects repeat across shifts; stringify each ObjectId once
+            uid_strs = {}
+            project_names_by_oid = {}
+            for s in shifts_cursor:
                 try:
-                    date_obj = datetime.strptime(date_str, "%Y-%m-%d").date()
-                except:
-                    continue
-
-                start = f"{date_str}T{start_time}:00"
-
-                # Night shift: C → end next day
-                # Weekoff/Leave: all day events
-                if shift_code == "C":
-                    end_date = date_obj + timedelta(days=1)
-                    end = f"{end_date.isoformat()}T{end_time}:00"
-                elif shift_code in ["W", "L"]:
-                    # All day event for weekoff/leave
-                    end = f"{date_str}T{end_time}:00"
-                else:
-                    end = f"{date_str}T{end_time}:00"
-
-                uid = str(s.get("user_id", ""))
-                pid = str(s.get("project_id")) if s.get("project_id") else None
-
-                user_info = users_map.get(uid, {"name": "Unknown", "profile_pic": "default.png"})
-                user_name = user_info["name"]
-                profile_pic = user_info["profile_pic"]
-                project_name = projects_map.get(pid, "General") if pid else "General"
-                task = s.get("task", "")
+                    date_str = s.get("date")  # "YYYY-MM-DD"
+                    if not date_str:
+                        continue
+                    
+                    start_time = s.get("start_time") or "09:00"
+                    end_time = s.get("end_time") or "17:00"
+                    shift_code = s.get("shift_code", "")
+
+                    start = f"{date_str}T{start_time}:00"
+
+                    # Night shift: C → end next day
+                    # Weekoff/Leave: all day events
+                    if shift_code == "C":
+                        try:
+                            end = f"{next_day(date_str)}T{end_time}:00"
+                        except ValueError:
+                            continue
+                    elif shift_code in ["W", "L"]:
+                        # All day event for weekoff/leave
+                        end = f"{date_str}T{end_time}:00"
+                    else:
+                        end = f"{date_str}T{end_time}:00"
+
+                    user_oid = s.get("user_id", "")
+                    uid = uid_strs.get(user_oid) or uid_strs.setdefault(user_oid, str(user_oid))
+                    project_id = s.get("project_id")
+                    sid = str(s["_id"])
+
+                    user_info = get_user(uid, unknown_user)
+                    user_name = user_info["name"]
+                    profile_pic = user_info["profile_pic"]
+                    if project_id:
+                        project_name = project_names_by_oid.get(project_id) or project_names_by_oid.setdefault(
+                            project_id, get_project(str(project_id), "General")
+                        )
+                    else:
+                        project_name = "General"
+                    task = s.get("task", "")
 
-                color = SHIFT_COLORS.get(shift_code, "#0dcaf0")
-                shift_label = "Weekoff" if shift_code == "W" else ("Leave" if shift_code == "L" else shift_code)
-                tooltip = f"{user_name} • {project_name} • {shift_label} • {task}"
+                    color = get_color(shift_code, DEFAULT_COLOR)
+                    shift_label = "Weekoff" if shift_code == "W" else ("Leave" if shift_code == "L" else shift_code)
+                    tooltip = f"{user_name} • {project_name} • {shift_label} • {task}"
 
-                shift_label = "Weekoff" if shift_code == "W" else ("Leave" if shift_code == "L" else shift_code)
-                events.append(
-                    {
-                        "id": str(s["_id"]),
+                    yield {
+                        "id": sid,
                         "title": f"{project_name}: {user_name} – {shift_label}",
                         "start": start,
                         "end": end,
@@ -304,7 +414,7 @@ def api_shifts():
                         "borderColor": color,
                         "allDay": shift_code in ["W", "L"],  # All day for weekoff/leave
                         "extendedProps": {
-                            "shift_id": str(s["_id"]),
+                            "shift_id": sid,
                             "user": user_name,
                             "user_id": uid,
                             "profile_pic": profile_pic,
@@ -314,13 +424,12 @@ def api_shifts():
                             "tooltip": tooltip,
                         },
                     }
-                )
-            except Exception as e:
-                # Log error but continue processing other shifts
-                current_app.logger.error(f"Error processing shift {s.get('_id')}: {str(e)}")
-                continue
+                except Exception as e:
+                    # Log error but continue processing other shifts
+                    current_app.logger.error(f"Error processing shift {s.get('_id')}: {str(e)}")
+                    continue
 
-        return jsonify(events)
+        return stream_json_array(iter_events())
     except Exception as e:
         current_app.logger.error(f"Error in api_shifts: {str(e)}")
         return jsonify({"error": "Internal server error"}), 500
@@ -354,33 +463,29 @@ def api_update_shift():
     start_time = start_dt.strftime("%H:%M")
     end_time = end_dt.strftime("%H:%M")
 
-    current_shift = mongo.db.shifts.find_one({"_id": ObjectId(shift_id)})
-    if not current_shift:
-        return jsonify({"success": False, "error": "Shift not found"}), 404
-
-    if current_shift.get("date") != date_str:
-        has_conflict, _ = check_shift_conflict(
-            current_shift["user_id"], date_str, exclude_shift_id=shift_id
-        )
-        if has_conflict:
-            return jsonify(
-                {
-                    "success": False,
-                    "error": f"User already has a shift on {date_str}. Cannot move shift to this date.",
+    # The unique (user_id, date) index rejects moves onto an occupied date
+    try:
+        result = mongo.db.shifts.update_one(
+            {"_id": ObjectId(shift_id)},
+            {
+                "$set": {
+                    "date": date_str,
+                    "start_time": start_time,
+                    "end_time": end_time,
+                    "updated_at": datetime.utcnow(),
                 }
-            ), 400
-
-    mongo.db.shifts.update_one(
-        {"_id": ObjectId(shift_id)},
-        {
-            "$set": {
-                "date": date_str,
-                "start_time": start_time,
-                "end_time": end_time,
-                "updated_at": datetime.utcnow(),
+            },
+        )
+    except DuplicateKeyError:
+        return jsonify(
+            {
+                "success": False,
+                "error": f"User already has a shift on {date_str}. Cannot move shift to this date.",
             }
-        },
-    )
+        ), 400
+
+    if not result.matched_count:
+        return jsonify({"success": False, "error": "Shift not found"}), 404
 
     return jsonify({"success": True})
 
@@ -414,11 +519,10 @@ def project_members():
             )
             
             # Get shifts for this project and date range (current week)
-            from datetime import timedelta
-            start_date = datetime.strptime(selected_date, "%Y-%m-%d")
+            start_date = date.fromisoformat(selected_date)
             end_date = start_date + timedelta(days=6)
-            start_str = start_date.strftime("%Y-%m-%d")
-            end_str = end_date.strftime("%Y-%m-%d")
+            start_str = start_date.isoformat()
+            end_str = end_date.isoformat()
             
             # Get all shifts for this project in the date range
             shifts = list(mongo.db.shifts.find({
@@ -431,35 +535,33 @@ def project_members():
                 "project_id": pid
             }))
             
+            # Bucket shifts and tasks by member in one pass each
+            # (already date-ordered, so each bucket stays sorted)
+            shifts_by_member = defaultdict(list)
+            for s in shifts:
+                # Convert ObjectIds to strings for template
+                s["_id"] = str(s["_id"])
+                if s.get("user_id"):
+                    s["user_id"] = str(s["user_id"])
+                if s.get("project_id"):
+                    s["project_id"] = str(s["project_id"])
+                shifts_by_member[s.get("user_id")].append(s)
+
+            tasks_by_member = defaultdict(list)
+            for t in tasks:
+                t["_id"] = str(t["_id"])
+                if t.get("project_id"):
+                    t["project_id"] = str(t["project_id"])
+                if t.get("assigned_to"):
+                    t["assigned_to"] = str(t["assigned_to"])
+                tasks_by_member[t.get("assigned_to")].append(t)
+
             # Organize data by member
-            members_map = {str(m["_id"]): m for m in members}
             for member in members:
                 member_id = str(member["_id"])
                 member["_id"] = member_id
-                
-                # Get shifts for this member in this project
-                member_shifts = []
-                for s in shifts:
-                    if str(s.get("user_id")) == member_id:
-                        # Convert ObjectIds to strings for template
-                        s["_id"] = str(s["_id"])
-                        if s.get("user_id"):
-                            s["user_id"] = str(s["user_id"])
-                        if s.get("project_id"):
-                            s["project_id"] = str(s["project_id"])
-                        member_shifts.append(s)
-                
-                # Get tasks assigned to this member
-                member_tasks = []
-                for t in tasks:
-                    if str(t.get("assigned_to")) == member_id:
-                        # Convert ObjectIds to strings for template
-                        t["_id"] = str(t["_id"])
-                        if t.get("project_id"):
-                            t["project_id"] = str(t["project_id"])
-                        if t.get("assigned_to"):
-                            t["assigned_to"] = str(t["assigned_to"])
-                        member_tasks.append(t)
+                member_shifts = shifts_by_member.get(member_id, [])
+                member_tasks = tasks_by_member.get(member_id, [])
                 
                 members_data.append({
                     "member": member,
@@ -496,12 +598,12 @@ def shift_wise_view():
         query["project_id"] = ObjectId(selected_project)
     
     # Get all shifts for the selected date
-    shifts = list(mongo.db.shifts.find(query))
+    shifts = list(mongo.db.shifts.find(query, SHIFT_FIELDS))
     
     # Get all users and projects for mapping
-    all_users = list(mongo.db.users.find())
+    all_users = mongo.db.users.find({}, {"name": 1, "email": 1})
     users_map = {str(u["_id"]): u for u in all_users}
-    projects_map = {str(p["_id"]): p["name"] for p in mongo.db.projects.find()}
+    projects_map = project_names()
     
     # Group shifts by shift code
     shift_groups = {
@@ -572,9 +674,9 @@ def export_csv():
     if project_id:
         query["project_id"] = ObjectId(project_id)
 
-    shifts = mongo.db.shifts.find(query).sort("date", 1)
-    users_map = {str(u["_id"]): u["name"] for u in mongo.db.users.find()}
-    projects_map = {str(p["_id"]): p["name"] for p in mongo.db.projects.find()}
+    shifts = mongo.db.shifts.find(query, SHIFT_FIELDS).sort("date", 1)
+    users_map = user_names()
+    projects_map = project_names()
 
     output = io.StringIO()
     writer = csv.writer(output)
@@ -614,9 +716,9 @@ def export_print():
     if project_id:
         query["project_id"] = ObjectId(project_id)
 
-    shifts = list(mongo.db.shifts.find(query).sort("date", 1))
-    users_map = {str(u["_id"]): u["name"] for u in mongo.db.users.find()}
-    projects_map = {str(p["_id"]): p["name"] for p in mongo.db.projects.find()}
+    shifts = list(mongo.db.shifts.find(query, SHIFT_FIELDS).sort("date", 1))
+    users_map = user_names()
+    projects_map = project_names()
 
     return render_template(
         "manager/export_print.html",
@@ -635,27 +737,30 @@ def manage_shifts():
     projects = list(mongo.db.projects.find())
     selected_date = request.args.get("date")
     selected_project = request.args.get("project_id")
+    selected_project_oid = ObjectId(selected_project) if selected_project else None
     show_all_members = request.args.get("show_all", "false") == "true"
 
     if selected_project and not show_all_members:
         users = list(
             mongo.db.users.find(
-                {"role": "member", "project_ids": ObjectId(selected_project)}
+                {"role": "member", "project_ids": selected_project_oid}
             )
         )
     else:
         users = list(mongo.db.users.find({"role": "member"}))
 
     if request.method == "POST":
-        action = request.form.get("action")
+        form = request.form
+        action = form.get("action")
+        now = datetime.utcnow()
 
         # ---------------- BULK SHIFT ASSIGNMENT ----------------
         if action == "bulk_add_shifts":
-            project_id = request.form.get("bulk_project_id")
-            shift_code = request.form.get("bulk_shift_code")
-            date_str = request.form.get("bulk_date")
-            task = request.form.get("bulk_task", "")
-            selected_members = request.form.getlist("selected_members")
+            project_id = form.get("bulk_project_id")
+            shift_code = form.get("bulk_shift_code")
+            date_str = form.get("bulk_date")
+            task = form.get("bulk_task", "")
+            selected_members = form.getlist("selected_members")
             
             if not project_id or not shift_code or not date_str:
                 flash("Please fill in all required fields (Project, Shift, Date).", "danger")
@@ -681,7 +786,7 @@ def manage_shifts():
                 existing_shift = mongo.db.shifts.find_one({
                     "date": date_str,
                     "user_id": ObjectId(user_id)
-                })
+                }, {"_id": 1})
                 
                 if existing_shift:
                     conflict_count += 1
@@ -696,17 +801,22 @@ def manage_shifts():
                     "end_time": end_time,
                     "task": task,
                     "project_id": ObjectId(project_id),
-                    "created_at": datetime.utcnow(),
-                    "updated_at": datetime.utcnow()
+                    "created_at": now,
+                    "updated_at": now
                 }
                 
-                mongo.db.shifts.insert_one(doc)
+                try:
+                    mongo.db.shifts.insert_one(doc)
+                except DuplicateKeyError:
+                    # Assigned concurrently since the pre-read
+                    conflict_count += 1
+                    continue
                 
                 # Send notification
-                mongo.db.notifications.insert_one({
+                _notify({
                     "user_id": ObjectId(user_id),
                     "message": f"You have been assigned a {shift_code} shift on {date_str}.",
-                    "created_at": datetime.utcnow(),
+                    "created_at": now,
                     "read": False,
                 })
                 
@@ -725,10 +835,10 @@ def manage_shifts():
 
         # ---------------- TASK CREATION ----------------
         if action == "add_task":
-            task_name = request.form.get("task_name")
-            assigned_to = request.form.get("assigned_to")
-            due_date = request.form.get("due_date")
-            project_id = request.form.get("project_id")
+            task_name = form.get("task_name")
+            assigned_to = form.get("assigned_to")
+            due_date = form.get("due_date")
+            project_id = form.get("project_id")
 
             if not project_id:
                 flash("Please select a project.", "danger")
@@ -740,16 +850,16 @@ def manage_shifts():
                     "task_name": task_name,
                     "assigned_to": ObjectId(assigned_to),
                     "due_date": due_date,
-                    "created_at": datetime.utcnow(),
+                    "created_at": now,
                 }
             )
 
-            mongo.db.notifications.insert_one(
+            _notify(
                 {
                     "user_id": ObjectId(assigned_to),
                     "message": f"New task '{task_name}' assigned to you for project.",
                     "project_id": ObjectId(project_id),
-                    "created_at": datetime.utcnow(),
+                    "created_at": now,
                     "read": False,
                 }
             )
@@ -762,11 +872,11 @@ def manage_shifts():
 
         # ---------------- SHIFT CREATION / UPDATE (AUTO TIME) ----------------
         if action == "add_shift" or action is None:
-            date_str = request.form.get("date")
-            user_id = request.form.get("user_id")
-            shift_code = request.form.get("shift_code")
-            task = request.form.get("task")
-            project_id = request.form.get("project_id") or None
+            date_str = form.get("date")
+            user_id = form.get("user_id")
+            shift_code = form.get("shift_code")
+            task = form.get("task")
+            project_id = form.get("project_id") or None
 
             if not date_str or not user_id or not shift_code:
                 flash("Please fill in all required fields for shift.", "danger")
@@ -780,7 +890,7 @@ def manage_shifts():
             )
 
             existing_shift = mongo.db.shifts.find_one(
-                {"date": date_str, "user_id": ObjectId(user_id)}
+                {"date": date_str, "user_id": ObjectId(user_id)}, {"_id": 1}
             )
 
             doc = {
@@ -790,7 +900,7 @@ def manage_shifts():
                 "start_time": start_time,
                 "end_time": end_time,
                 "task": task,
-                "updated_at": datetime.utcnow(),
+                "updated_at": now,
             }
 
             if project_id:
@@ -802,23 +912,31 @@ def manage_shifts():
                 mongo.db.shifts.update_one(
                     {"_id": existing_shift["_id"]}, {"$set": doc}
                 )
-                mongo.db.notifications.insert_one(
+                _notify(
                     {
                         "user_id": ObjectId(user_id),
                         "message": f"Your shift on {date_str} has been updated.",
-                        "created_at": datetime.utcnow(),
+                        "created_at": now,
                         "read": False,
                     }
                 )
                 flash("Shift updated successfully.", "success")
             else:
-                doc["created_at"] = datetime.utcnow()
-                mongo.db.shifts.insert_one(doc)
-                mongo.db.notifications.insert_one(
+                doc["created_at"] = now
+                try:
+                    mongo.db.shifts.insert_one(doc)
+                except DuplicateKeyError:
+                    # Assigned concurrently since the pre-read (e.g. a double submit)
+                    flash(f"This member already has a shift on {date_str}.", "warning")
+                    redirect_url = url_for("manager.manage_shifts", date=date_str)
+                    if selected_project:
+                        redirect_url += f"&project_id={selected_project}"
+                    return redirect(redirect_url)
+                _notify(
                     {
                         "user_id": ObjectId(user_id),
                         "message": f"You have been assigned a shift on {date_str}.",
-                        "created_at": datetime.utcnow(),
+                        "created_at": now,
                         "read": False,
                     }
                 )
@@ -833,7 +951,7 @@ def manage_shifts():
     if selected_date:
         query["date"] = selected_date
     if selected_project:
-        query["project_id"] = ObjectId(selected_project)
+        query["project_id"] = selected_project_oid
 
     shifts = list(mongo.db.shifts.find(query).sort("date", 1))
     
@@ -849,24 +967,14 @@ def manage_shifts():
     shift_order = {"A": 1, "G": 2, "B": 3, "C": 4}
     shifts.sort(key=lambda x: (shift_order.get(x.get("shift_code", ""), 99), x.get("date", ""), x.get("start_time", "")))
 
-    tasks = []
-    if selected_project:
-        tasks = list(
-            mongo.db.project_tasks.find({"project_id": ObjectId(selected_project)}).sort(
-                "created_at", -1
-            )
-        )
-
-    all_members = list(mongo.db.users.find({"role": "member"}))
+    # Unfiltered views already loaded every member above
+    if selected_project and not show_all_members:
+        all_members = mongo.db.users.find({"role": "member"}, {"name": 1})
+    else:
+        all_members = users
     users_map = {str(u["_id"]): u["name"] for u in all_members}
     projects_map = {str(p["_id"]): p["name"] for p in projects}
 
-    shifts_map = {}
-    if selected_date:
-        cursor = mongo.db.shifts.find({"date": selected_date})
-        for s in cursor:
-            shifts_map[str(s["user_id"])] = s
-
     # Get today's date for date input min attribute
     from datetime import date
     today_date = date.today().isoformat()
@@ -884,9 +992,7 @@ def manage_shifts():
         selected_date=selected_date,
         selected_project=selected_project,
         show_all_members=show_all_members,
-        shifts_map=shifts_map,
         shifts=shifts,
-        tasks=tasks,
         users_map=users_map,
         projects_map=projects_map,
         today_date=today_date,
@@ -905,11 +1011,13 @@ def upload_excel():
     Supports both Excel file upload and copy-paste from spreadsheet
     """
     if request.method == "POST":
-        action = request.form.get("action", "upload")
+        form = request.form
+        action = form.get("action", "upload")
+        now = datetime.utcnow()
         
         # Handle copy-paste import
         if action == "paste":
-            paste_data = request.form.get("paste_data", "").strip()
+            paste_data = form.get("paste_data", "").strip()
             if not paste_data:
                 flash("Please paste data from your spreadsheet.", "danger")
                 return redirect("/manager/upload-excel")
@@ -945,15 +1053,16 @@ def upload_excel():
                 task_col = None
                 
                 for idx, header in enumerate(headers):
-                    if "date" in header:
+                    role = _HEADER_ALIASES.get(header)
+                    if role == "date":
                         date_col = idx
-                    elif "member" in header or ("name" in header and "project" not in header):
+                    elif role == "member":
                         member_col = idx
-                    elif "project" in header:
+                    elif role == "project":
                         project_col = idx
-                    elif "shift" in header:
+                    elif role == "shift":
                         shift_col = idx
-                    elif "task" in header:
+                    elif role == "task":
                         task_col = idx
                 
                 if date_col is None or member_col is None or shift_col is None:
@@ -961,17 +1070,22 @@ def upload_excel():
                     return redirect("/manager/upload-excel")
                 
                 # Get all users and projects for mapping
-                users_list = list(mongo.db.users.find({"role": "member"}))
+                users_list = list(mongo.db.users.find({"role": "member"}, {"name": 1, "email": 1}))
                 users_map = {u.get("name", "").lower(): u["_id"] for u in users_list}
                 users_map.update({u.get("email", "").lower(): u["_id"] for u in users_list})
                 
-                projects_list = list(mongo.db.projects.find())
+                projects_list = list(mongo.db.projects.find({}, {"name": 1}))
                 projects_map = {p.get("name", "").lower(): p["_id"] for p in projects_list}
                 
                 imported_count = 0
                 error_count = 0
                 errors = []
                 
+                get_timing = SHIFT_TIMINGS.get
+                shift_ops = []
+                notif_ops = []
+                op_rows = []
+
                 # Process data rows (skip header)
                 for row_idx, line in enumerate(lines[1:], 2):
                     try:
@@ -996,15 +1110,7 @@ def upload_excel():
                             continue
                         
                         # Parse date
-                        date_str = None
-                        date_formats = ["%Y-%m-%d", "%d/%m/%Y", "%m/%d/%Y", "%d-%m-%Y", "%Y/%m/%d", "%d.%m.%Y"]
-                        for fmt in date_formats:
-                            try:
-                                date_obj = datetime.strptime(date_val.strip(), fmt)
-                                date_str = date_obj.strftime("%Y-%m-%d")
-                                break
-                            except:
-                                continue
+                        date_str = parse_import_date(date_val)
                         
                         if not date_str:
                             errors.append(f"Row {row_idx}: Invalid date format '{date_val}'")
@@ -1033,13 +1139,7 @@ def upload_excel():
                             continue
                         
                         # Get shift timings
-                        start_time, end_time = SHIFT_TIMINGS.get(shift_code, ("09:00", "17:00"))
-                        
-                        # Check for existing shift
-                        existing = mongo.db.shifts.find_one({
-                            "user_id": user_id,
-                            "date": date_str
-                        })
+                        start_time, end_time = get_timing(shift_code, ("09:00", "17:00"))
                         
                         task_str = str(task_val).strip() if task_val else ""
                         
@@ -1051,32 +1151,40 @@ def upload_excel():
                             "end_time": end_time,
                             "task": task_str,
                             "project_id": project_id,
-                            "created_at": datetime.utcnow(),
-                            "updated_at": datetime.utcnow()
+                            "created_at": now,
+                            "updated_at": now
                         }
                         
-                        if existing:
-                            mongo.db.shifts.update_one(
-                                {"_id": existing["_id"]},
-                                {"$set": shift_doc}
-                            )
-                        else:
-                            mongo.db.shifts.insert_one(shift_doc)
+                        # Upsert on (user, date) replaces the existing-shift lookup
+                        shift_ops.append(UpdateOne(
+                            {"user_id": user_id, "date": date_str},
+                            {"$set": shift_doc},
+                            upsert=True,
+                        ))
                         
                         # Send notification
-                        mongo.db.notifications.insert_one({
+                        notif_ops.append({
                             "user_id": user_id,
                             "message": f"You have been assigned a {shift_code} shift on {date_str}.",
-                            "created_at": datetime.utcnow(),
+                            "created_at": now,
                             "read": False,
                         })
-                        
-                        imported_count += 1
+                        op_rows.append(row_idx)
                         
                     except Exception as e:
                         errors.append(f"Row {row_idx}: {str(e)}")
                         error_count += 1
                         continue
+                    
+                    # Counted from the bulk write result, not when queued
+                    if len(shift_ops) >= IMPORT_BATCH_SIZE:
+                        written, failed = _flush_import_ops(shift_ops, notif_ops, op_rows, errors)
+                        imported_count += written
+                        error_count += failed
+                
+                written, failed = _flush_import_ops(shift_ops, notif_ops, op_rows, errors)
+                imported_count += written
+                error_count += failed
                 
                 if imported_count > 0:
                     flash(f"Successfully imported {imported_count} shifts from pasted data! The calendar will refresh automatically.", "success")
@@ -1127,16 +1235,17 @@ def upload_excel():
             task_col = None
             
             for idx, header in enumerate(headers, 1):
-                header_lower = str(header).lower() if header else ""
-                if "date" in header_lower:
+                header_lower = str(header).strip().lower() if header else ""
+                role = _HEADER_ALIASES.get(header_lower)
+                if role == "date":
                     date_col = idx
-                elif "member" in header_lower or "name" in header_lower:
+                elif role == "member":
                     member_col = idx
-                elif "project" in header_lower:
+                elif role == "project":
                     project_col = idx
-                elif "shift" in header_lower:
+                elif role == "shift":
                     shift_col = idx
-                elif "task" in header_lower:
+                elif role == "task":
                     task_col = idx
             
             if not all([date_col, member_col, shift_col]):
@@ -1144,17 +1253,22 @@ def upload_excel():
                 return redirect("/manager/upload-excel")
             
             # Get all users and projects for mapping
-            users_list = list(mongo.db.users.find({"role": "member"}))
+            users_list = list(mongo.db.users.find({"role": "member"}, {"name": 1, "email": 1}))
             users_map = {u.get("name", "").lower(): u["_id"] for u in users_list}
             users_map.update({u.get("email", "").lower(): u["_id"] for u in users_list})
             
-            projects_list = list(mongo.db.projects.find())
+            projects_list = list(mongo.db.projects.find({}, {"name": 1}))
             projects_map = {p.get("name", "").lower(): p["_id"] for p in projects_list}
             
             imported_count = 0
             error_count = 0
             errors = []
             
+            get_timing = SHIFT_TIMINGS.get
+            shift_ops = []
+            notif_ops = []
+            op_rows = []
+
             # Process rows (skip header)
             for row_idx, row in enumerate(ws.iter_rows(min_row=2, values_only=False), 2):
                 try:
@@ -1174,14 +1288,7 @@ def upload_excel():
                     if isinstance(date_val, datetime):
                         date_str = date_val.strftime("%Y-%m-%d")
                     elif isinstance(date_val, str):
-                        date_formats = ["%Y-%m-%d", "%d/%m/%Y", "%m/%d/%Y", "%d-%m-%Y", "%Y/%m/%d"]
-                        for fmt in date_formats:
-                            try:
-                                date_obj = datetime.strptime(date_val.strip(), fmt)
-                                date_str = date_obj.strftime("%Y-%m-%d")
-                                break
-                            except:
-                                continue
+                        date_str = parse_import_date(date_val, EXCEL_DATE_FORMATS)
                     
                     if not date_str:
                         errors.append(f"Row {row_idx}: Invalid date format '{date_val}'")
@@ -1210,13 +1317,7 @@ def upload_excel():
                         continue
                     
                     # Get shift timings
-                    start_time, end_time = SHIFT_TIMINGS.get(shift_code, ("09:00", "17:00"))
-                    
-                    # Check for existing shift
-                    existing = mongo.db.shifts.find_one({
-                        "user_id": user_id,
-                        "date": date_str
-                    })
+                    start_time, end_time = get_timing(shift_code, ("09:00", "17:00"))
                     
                     task_str = str(task_val).strip() if task_val else ""
                     
@@ -1228,32 +1329,40 @@ def upload_excel():
                         "end_time": end_time,
                         "task": task_str,
                         "project_id": project_id,
-                        "created_at": datetime.utcnow(),
-                        "updated_at": datetime.utcnow()
+                        "created_at": now,
+                        "updated_at": now
                     }
                     
-                    if existing:
-                        mongo.db.shifts.update_one(
-                            {"_id": existing["_id"]},
-                            {"$set": shift_doc}
-                        )
-                    else:
-                        mongo.db.shifts.insert_one(shift_doc)
+                    # Upsert on (user, date) replaces the existing-shift lookup
+                    shift_ops.append(UpdateOne(
+                        {"user_id": user_id, "date": date_str},
+                        {"$set": shift_doc},
+                        upsert=True,
+                    ))
                     
                     # Send notification
-                    mongo.db.notifications.insert_one({
+                    notif_ops.append({
                         "user_id": user_id,
                         "message": f"You have been assigned a {shift_code} shift on {date_str}.",
-                        "created_at": datetime.utcnow(),
+                        "created_at": now,
                         "read": False,
                     })
-                    
-                    imported_count += 1
+                    op_rows.append(row_idx)
                     
                 except Exception as e:
                     errors.append(f"Row {row_idx}: {str(e)}")
                     error_count += 1
                     continue
+                
+                # Counted from the bulk write result, not when queued
+                if len(shift_ops) >= IMPORT_BATCH_SIZE:
+                    written, failed = _flush_import_ops(shift_ops, notif_ops, op_rows, errors)
+                    imported_count += written
+                    error_count += failed
+            
+            written, failed = _flush_import_ops(shift_ops, notif_ops, op_rows, errors)
+            imported_count += written
+            error_count += failed
             
             if imported_count > 0:
                 flash(f"Successfully imported {imported_count} shifts from Excel! The calendar will refresh automatically.", "success")
@@ -1306,48 +1415,23 @@ def upload_excel():
 @manager_bp.route("/edit-shift/<shift_id>", methods=["GET", "POST"], endpoint="edit_shift")
 @manager_required
 def edit_shift(shift_id):
-    shift = mongo.db.shifts.find_one({"_id": ObjectId(shift_id)})
+    shift_oid = ObjectId(shift_id) if ObjectId.is_valid(shift_id) else None
+    shift = mongo.db.shifts.find_one({"_id": shift_oid}) if shift_oid else None
     if not shift:
         flash("Shift not found.", "danger")
         return redirect(url_for("manager.dashboard"))
 
-    projects = list(mongo.db.projects.find())
-    shift_project_id = shift.get("project_id")
-    show_all = request.args.get("show_all", "false") == "true"
-
-    if shift_project_id and not show_all:
-        users = list(
-            mongo.db.users.find(
-                {"role": "member", "project_ids": shift_project_id}
-            )
-        )
-        current_user_id = shift.get("user_id")
-        if current_user_id:
-            current_user = mongo.db.users.find_one({"_id": current_user_id})
-            if current_user and current_user not in users:
-                users.append(current_user)
-    else:
-        users = list(mongo.db.users.find({"role": "member"}))
-
     if request.method == "POST":
-        date_str = request.form.get("date")
-        user_id = request.form.get("user_id")
-        shift_code = request.form.get("shift_code")
-        task = request.form.get("task")
-        project_id = request.form.get("project_id") or None
+        form = request.form
+        date_str = form.get("date")
+        user_id = form.get("user_id")
+        shift_code = form.get("shift_code")
+        task = form.get("task")
+        project_id = form.get("project_id") or None
+        now = datetime.utcnow()
 
         start_time, end_time = SHIFT_TIMINGS.get(shift_code, ("09:00", "17:00"))
 
-        has_conflict, _ = check_shift_conflict(
-            user_id, date_str, exclude_shift_id=shift_id
-        )
-        if has_conflict:
-            flash(
-                f"Conflict: user already has a shift on {date_str}.",
-                "danger",
-            )
-            return redirect(url_for("manager.edit_shift", shift_id=shift_id))
-
         update_doc = {
             "date": date_str,
             "user_id": ObjectId(user_id),
@@ -1355,23 +1439,31 @@ def edit_shift(shift_id):
             "start_time": start_time,
             "end_time": end_time,
             "task": task,
-            "updated_at": datetime.utcnow(),
+            "updated_at": now,
         }
         if project_id:
             update_doc["project_id"] = ObjectId(project_id)
         else:
             update_doc["project_id"] = None
 
-        mongo.db.shifts.update_one(
-            {"_id": ObjectId(shift_id)}, {"$set": update_doc}
-        )
+        # The unique (user_id, date) index rejects conflicting updates
+        try:
+            mongo.db.shifts.update_one(
+                {"_id": shift_oid}, {"$set": update_doc}
+            )
+        except DuplicateKeyError:
+            flash(
+                f"Conflict: user already has a shift on {date_str}.",
+                "danger",
+            )
+            return redirect(url_for("manager.edit_shift", shift_id=shift_id))
 
-        mongo.db.notifications.insert_one(
+        _notify(
             {
                 "user_id": ObjectId(user_id),
                 "message": f"Your shift on {date_str} has been updated by the manager.",
                 "project_id": ObjectId(project_id) if project_id else None,
-                "created_at": datetime.utcnow(),
+                "created_at": now,
                 "read": False,
             }
         )
@@ -1379,7 +1471,30 @@ def edit_shift(shift_id):
         flash("Shift updated and user notified.", "success")
         return redirect(url_for("manager.dashboard"))
 
-    all_users = list(mongo.db.users.find({"role": "member"}))
+    projects = list(mongo.db.projects.find())
+    shift_project_id = shift.get("project_id")
+    show_all = request.args.get("show_all", "false") == "true"
+
+    # One members query serves both the full list and the project-filtered one
+    all_users = list(
+        mongo.db.users.find(
+            {"role": "member"}, {"name": 1, "email": 1, "project_ids": 1}
+        )
+    )
+
+    if shift_project_id and not show_all:
+        users = [u for u in all_users if shift_project_id in u.get("project_ids", [])]
+        current_user_id = shift.get("user_id")
+        if current_user_id and not any(u["_id"] == current_user_id for u in users):
+            current_user = next(
+                (u for u in all_users if u["_id"] == current_user_id), None
+            ) or mongo.db.users.find_one(
+                {"_id": current_user_id}, {"name": 1, "email": 1, "project_ids": 1}
+            )
+            if current_user:
+                users.append(current_user)
+    else:
+        users = all_users
 
     return render_template(
         "manager/edit_shift.html",
@@ -1398,7 +1513,8 @@ def edit_shift(shift_id):
 @manager_bp.route("/delete-shift/<shift_id>", methods=["POST"], endpoint="delete_shift")
 @manager_required
 def delete_shift(shift_id):
-    shift = mongo.db.shifts.find_one({"_id": ObjectId(shift_id)})
+    shift_oid = ObjectId(shift_id) if ObjectId.is_valid(shift_id) else None
+    shift = mongo.db.shifts.find_one({"_id": shift_oid}) if shift_oid else None
     if not shift:
         flash("Shift not found.", "danger")
         return redirect(url_for("manager.manage_shifts"))
@@ -1406,10 +1522,10 @@ def delete_shift(shift_id):
     user_id = shift.get("user_id")
     date_str = shift.get("date", "")
 
-    mongo.db.shifts.delete_one({"_id": ObjectId(shift_id)})
+    mongo.db.shifts.delete_one({"_id": shift_oid})
 
     if user_id:
-        mongo.db.notifications.insert_one(
+        _notify(
             {
                 "user_id": user_id,
                 "message": f"Your shift on {date_str} has been removed.",
@@ -1428,7 +1544,8 @@ def delete_shift(shift_id):
 @manager_bp.route("/reassign-shift/<shift_id>", methods=["POST"], endpoint="reassign_shift")
 @manager_required
 def reassign_shift(shift_id):
-    shift = mongo.db.shifts.find_one({"_id": ObjectId(shift_id)})
+    shift_oid = ObjectId(shift_id) if ObjectId.is_valid(shift_id) else None
+    shift = mongo.db.shifts.find_one({"_id": shift_oid}) if shift_oid else None
     if not shift:
         flash("Shift not found.", "danger")
         return redirect(url_for("manager.manage_shifts"))
@@ -1441,10 +1558,16 @@ def reassign_shift(shift_id):
     new_user_id = ObjectId(new_user_id)
     date_str = shift.get("date", "")
     old_user_id = shift.get("user_id")
+    now = datetime.utcnow()
 
-    has_conflict, _ = check_shift_conflict(str(new_user_id), date_str, exclude_shift_id=shift_id)
-    if has_conflict:
-        user = mongo.db.users.find_one({"_id": new_user_id})
+    # The unique (user_id, date) index rejects conflicting reassignments
+    try:
+        mongo.db.shifts.update_one(
+            {"_id": shift_oid},
+            {"$set": {"user_id": new_user_id, "updated_at": now}},
+        )
+    except DuplicateKeyError:
+        user = mongo.db.users.find_one({"_id": new_user_id}, {"name": 1})
         user_name = user["name"] if user else "Unknown"
         flash(
             f"Conflict: {user_name} already has a shift on {date_str}.",
@@ -1452,29 +1575,26 @@ def reassign_shift(shift_id):
         )
         return redirect(url_for("manager.edit_shift", shift_id=shift_id))
 
-    mongo.db.shifts.update_one(
-        {"_id": ObjectId(shift_id)},
-        {"$set": {"user_id": new_user_id, "updated_at": datetime.utcnow()}},
-    )
-
+    notes = []
     if old_user_id:
-        mongo.db.notifications.insert_one(
+        notes.append(
             {
                 "user_id": old_user_id,
                 "message": f"Your shift on {date_str} has been reassigned.",
-                "created_at": datetime.utcnow(),
+                "created_at": now,
                 "read": False,
             }
         )
 
-    mongo.db.notifications.insert_one(
+    notes.append(
         {
             "user_id": new_user_id,
             "message": f"You have been assigned a shift on {date_str}.",
-            "created_at": datetime.utcnow(),
+            "created_at": now,
             "read": False,
         }
     )
+    _notify(*notes)
 
     flash("Shift reassigned successfully.", "success")
     return redirect(url_for("manager.manage_shifts"))
@@ -1487,8 +1607,10 @@ def reassign_shift(shift_id):
 @manager_required
 def change_requests():
     if request.method == "POST":
-        req_id = request.form.get("req_id")
-        action = request.form.get("action")
+        form = request.form
+        req_id = form.get("req_id")
+        action = form.get("action")
+        now = datetime.utcnow()
 
         if not req_id or not action:
             flash("Invalid request.", "danger")
@@ -1504,27 +1626,27 @@ def change_requests():
             start_t, end_t = SHIFT_TIMINGS.get(new_code, ("09:00", "17:00"))
 
             mongo.db.shifts.update_one(
-                {"date": req["date"], "user_id": req["user_id"]},
+                {"user_id": req["user_id"], "date": req["date"]},
                 {
                     "$set": {
                         "shift_code": new_code,
                         "start_time": start_t,
                         "end_time": end_t,
-                        "updated_at": datetime.utcnow(),
+                        "updated_at": now,
                     }
                 },
             )
 
             mongo.db.shift_change_requests.update_one(
                 {"_id": ObjectId(req_id)},
-                {"$set": {"status": "approved", "updated_at": datetime.utcnow()}},
+                {"$set": {"status": "approved", "updated_at": now}},
             )
 
-            mongo.db.notifications.insert_one(
+            _notify(
                 {
                     "user_id": req["user_id"],
                     "message": f"Your shift change request for {req['date']} has been approved.",
-                    "created_at": datetime.utcnow(),
+                    "created_at": now,
                     "read": False,
                 }
             )
@@ -1534,13 +1656,13 @@ def change_requests():
         elif action == "reject":
             mongo.db.shift_change_requests.update_one(
                 {"_id": ObjectId(req_id)},
-                {"$set": {"status": "rejected", "updated_at": datetime.utcnow()}},
+                {"$set": {"status": "rejected", "updated_at": now}},
             )
-            mongo.db.notifications.insert_one(
+            _notify(
                 {
                     "user_id": req["user_id"],
                     "message": f"Your shift change request for {req['date']} has been rejected.",
-                    "created_at": datetime.utcnow(),
+                    "created_at": now,
                     "read": False,
                 }
             )
@@ -1548,15 +1670,22 @@ def change_requests():
 
         return redirect(url_for("manager.change_requests"))
 
+    # Pending requests by default; ?history=1 includes approved/rejected
+    show_history = request.args.get("history") == "1"
+    status_query = {} if show_history else {"status": "pending"}
     requests = list(
-        mongo.db.shift_change_requests.find().sort("created_at", -1)
+        mongo.db.shift_change_requests.find(
+            status_query,
+            {"user_id": 1, "date": 1, "requested_shift": 1, "reason": 1, "status": 1},
+        ).sort("created_at", -1)
     )
-    users_map = {str(u["_id"]): u["name"] for u in mongo.db.users.find()}
+    users_map = user_names()
 
     return render_template(
         "manager/change_requests.html",
         requests=requests,
         users_map=users_map,
+        show_history=show_history,
     )
 
 
@@ -1567,8 +1696,10 @@ def change_requests():
 @manager_required
 def swap_requests():
     if request.method == "POST":
-        req_id = request.form.get("req_id")
-        action = request.form.get("action")
+        form = request.form
+        req_id = form.get("req_id")
+        action = form.get("action")
+        now = datetime.utcnow()
 
         if not req_id or not action:
             flash("Invalid request.", "danger")
@@ -1587,6 +1718,7 @@ def swap_requests():
                 {"date": req["date"], "user_id": req["target_user_id"]}
             )
 
+            shift_ops = []
             if requester_shift and target_shift:
                 requester_shift_code = requester_shift.get("shift_code")
                 target_shift_code = target_shift.get("shift_code")
@@ -1594,49 +1726,59 @@ def swap_requests():
                 t_start, t_end = SHIFT_TIMINGS.get(target_shift_code, ("09:00", "17:00"))
                 r_start, r_end = SHIFT_TIMINGS.get(requester_shift_code, ("09:00", "17:00"))
 
-                mongo.db.shifts.update_one(
-                    {"_id": requester_shift["_id"]},
-                    {
-                        "$set": {
-                            "shift_code": target_shift_code,
-                            "start_time": t_start,
-                            "end_time": t_end,
-                            "updated_at": datetime.utcnow(),
-                        }
-                    },
-                )
-                mongo.db.shifts.update_one(
-                    {"_id": target_shift["_id"]},
-                    {
-                        "$set": {
-                            "shift_code": requester_shift_code,
-                            "start_time": r_start,
-                            "end_time": r_end,
-                            "updated_at": datetime.utcnow(),
-                        }
-                    },
-                )
-
-            mongo.db.shift_swap_requests.update_one(
-                {"_id": ObjectId(req_id)},
-                {"$set": {"status": "approved", "updated_at": datetime.utcnow()}},
-            )
+                shift_ops = [
+                    UpdateOne(
+                        {"_id": requester_shift["_id"]},
+                        {
+                            "$set": {
+                                "shift_code": target_shift_code,
+                                "start_time": t_start,
+                                "end_time": t_end,
+                                "updated_at": now,
+                            }
+                        },
+                    ),
+                    UpdateOne(
+                        {"_id": target_shift["_id"]},
+                        {
+                            "$set": {
+                                "shift_code": requester_shift_code,
+                                "start_time": r_start,
+                                "end_time": r_end,
+                                "updated_at": now,
+                            }
+                        },
+                    ),
+                ]
 
-            mongo.db.notifications.insert_one(
-                {
-                    "user_id": req["requester_id"],
-                    "message": f"Your shift swap request for {req['date']} has been approved.",
-                    "created_at": datetime.utcnow(),
-                    "read": False,
-                }
-            )
-            mongo.db.notifications.insert_one(
-                {
-                    "user_id": req["target_user_id"],
-                    "message": f"Your shift swap request for {req['date']} has been approved.",
-                    "created_at": datetime.utcnow(),
-                    "read": False,
-                }
+            # Swap the shifts first; the request is only approved once they changed
+            if shift_ops:
+                try:
+                    mongo.db.shifts.bulk_write(shift_ops, ordered=True)
+                except PyMongoError as e:
+                    current_app.logger.error(f"Error swapping shifts for request {req_id}: {str(e)}")
+                    flash("Shifts could not be swapped; the request is still pending.", "danger")
+                    return redirect(url_for("manager.swap_requests"))
+
+            # Status change and notifications are independent of each other
+            _run_concurrently(
+                partial(
+                    mongo.db.shift_swap_requests.update_one,
+                    {"_id": ObjectId(req_id)},
+                    {"$set": {"status": "approved", "updated_at": now}},
+                ),
+                partial(
+                    _notify,
+                    *(
+                        {
+                            "user_id": user_id,
+                            "message": f"Your shift swap request for {req['date']} has been approved.",
+                            "created_at": now,
+                            "read": False,
+                        }
+                        for user_id in (req["requester_id"], req["target_user_id"])
+                    ),
+                ),
             )
 
             flash("Request approved and shifts swapped.", "success")
@@ -1644,13 +1786,13 @@ def swap_requests():
         elif action == "reject":
             mongo.db.shift_swap_requests.update_one(
                 {"_id": ObjectId(req_id)},
-                {"$set": {"status": "rejected", "updated_at": datetime.utcnow()}},
+                {"$set": {"status": "rejected", "updated_at": now}},
             )
-            mongo.db.notifications.insert_one(
+            _notify(
                 {
                     "user_id": req["requester_id"],
                     "message": f"Your shift swap request for {req['date']} has been rejected.",
-                    "created_at": datetime.utcnow(),
+                    "created_at": now,
                     "read": False,
                 }
             )
@@ -1658,13 +1800,22 @@ def swap_requests():
 
         return redirect(url_for("manager.swap_requests"))
 
-    requests = list(mongo.db.shift_swap_requests.find().sort("created_at", -1))
-    users_map = {str(u["_id"]): u["name"] for u in mongo.db.users.find()}
+    # Pending requests by default; ?history=1 includes approved/rejected
+    show_history = request.args.get("history") == "1"
+    status_query = {} if show_history else {"status": "pending"}
+    requests = list(
+        mongo.db.shift_swap_requests.find(
+            status_query,
+            {"requester_id": 1, "target_user_id": 1, "date": 1, "reason": 1, "status": 1},
+        ).sort("created_at", -1)
+    )
+    users_map = user_names()
 
     return render_template(
         "manager/swap_requests.html",
         requests=requests,
         users_map=users_map,
+        show_history=show_history,
     )
 
 
@@ -1675,8 +1826,10 @@ def swap_requests():
 @manager_required
 def leave_requests():
     if request.method == "POST":
-        req_id = request.form.get("req_id")
-        action = request.form.get("action")
+        form = request.form
+        req_id = form.get("req_id")
+        action = form.get("action")
+        now = datetime.utcnow()
 
         if not req_id or not action:
             flash("Invalid request.", "danger")
@@ -1692,65 +1845,63 @@ def leave_requests():
             shift_code = "W" if req["type"] == "weekoff" else "L"
             start_time, end_time = SHIFT_TIMINGS.get(shift_code, ("00:00", "23:59"))
             
-            # Check if shift already exists
-            existing_shift = mongo.db.shifts.find_one({
-                "date": req["date"],
-                "user_id": req["user_id"]
-            })
-            
-            if existing_shift:
-                # Update existing shift to weekoff/leave
+            # Turn an existing shift into weekoff/leave, or create the entry.
+            # The request is only approved once this write has succeeded
+            try:
                 mongo.db.shifts.update_one(
-                    {"_id": existing_shift["_id"]},
+                    {"user_id": req["user_id"], "date": req["date"]},
                     {
                         "$set": {
                             "shift_code": shift_code,
                             "start_time": start_time,
                             "end_time": end_time,
-                            "updated_at": datetime.utcnow(),
-                        }
-                    }
+                            "updated_at": now,
+                        },
+                        "$setOnInsert": {
+                            "task": f"{req['type'].title()} - {req.get('reason', '')}",
+                            "project_id": None,
+                            "created_at": now,
+                        },
+                    },
+                    upsert=True,
                 )
-            else:
-                # Create new shift entry
-                mongo.db.shifts.insert_one({
-                    "date": req["date"],
-                    "user_id": req["user_id"],
-                    "shift_code": shift_code,
-                    "start_time": start_time,
-                    "end_time": end_time,
-                    "task": f"{req['type'].title()} - {req.get('reason', '')}",
-                    "project_id": None,
-                    "created_at": datetime.utcnow(),
-                    "updated_at": datetime.utcnow(),
-                })
-            
-            # Update request status
-            mongo.db.leave_requests.update_one(
-                {"_id": ObjectId(req_id)},
-                {"$set": {"status": "approved", "updated_at": datetime.utcnow()}}
+            except PyMongoError as e:
+                current_app.logger.error(f"Error assigning {req['type']} for request {req_id}: {str(e)}")
+                flash(f"{req['type'].title()} could not be assigned; the request is still pending.", "danger")
+                return redirect(url_for("manager.leave_requests"))
+
+            # Status change and notification are independent of each other
+            _run_concurrently(
+                # Update request status
+                partial(
+                    mongo.db.leave_requests.update_one,
+                    {"_id": ObjectId(req_id)},
+                    {"$set": {"status": "approved", "updated_at": now}},
+                ),
+                # Send notification
+                partial(
+                    _notify,
+                    {
+                        "user_id": req["user_id"],
+                        "message": f"Your {req['type']} request for {req['date']} has been approved.",
+                        "created_at": now,
+                        "read": False,
+                    },
+                ),
             )
             
-            # Send notification
-            mongo.db.notifications.insert_one({
-                "user_id": req["user_id"],
-                "message": f"Your {req['type']} request for {req['date']} has been approved.",
-                "created_at": datetime.utcnow(),
-                "read": False,
-            })
-            
             flash(f"{req['type'].title()} request approved and assigned.", "success")
 
         elif action == "reject":
             mongo.db.leave_requests.update_one(
                 {"_id": ObjectId(req_id)},
-                {"$set": {"status": "rejected", "updated_at": datetime.utcnow()}}
+                {"$set": {"status": "rejected", "updated_at": now}}
             )
             
-            mongo.db.notifications.insert_one({
+            _notify({
                 "user_id": req["user_id"],
                 "message": f"Your {req['type']} request for {req['date']} has been rejected.",
-                "created_at": datetime.utcnow(),
+                "created_at": now,
                 "read": False,
             })
             
@@ -1758,14 +1909,22 @@ def leave_requests():
 
         return redirect(url_for("manager.leave_requests"))
 
-    # Get all leave/weekoff requests
-    requests = list(mongo.db.leave_requests.find().sort("created_at", -1))
-    users_map = {str(u["_id"]): u["name"] for u in mongo.db.users.find()}
+    # Pending requests by default; ?history=1 includes approved/rejected
+    show_history = request.args.get("history") == "1"
+    status_query = {} if show_history else {"status": "pending"}
+    requests = list(
+        mongo.db.leave_requests.find(
+            status_query,
+            {"user_id": 1, "date": 1, "type": 1, "reason": 1, "status": 1, "created_at": 1},
+        ).sort("created_at", -1)
+    )
+    users_map = user_names()
 
     return render_template(
         "manager/leave_requests.html",
         requests=requests,
         users_map=users_map,
+        show_history=show_history,
     )
 
 
@@ -1776,10 +1935,12 @@ def leave_requests():
 @manager_required
 def assign_weekoff_leave():
     if request.method == "POST":
-        user_id = request.form.get("user_id")
-        date_str = request.form.get("date")
-        type_val = request.form.get("type")  # "weekoff" or "leave"
-        reason = request.form.get("reason", "")
+        form = request.form
+        user_id = form.get("user_id")
+        date_str = form.get("date")
+        type_val = form.get("type")  # "weekoff" or "leave"
+        reason = form.get("reason", "")
+        now = datetime.utcnow()
         
         if not user_id or not date_str or not type_val:
             flash("Please fill in all required fields.", "danger")
@@ -1792,47 +1953,34 @@ def assign_weekoff_leave():
         shift_code = "W" if type_val == "weekoff" else "L"
         start_time, end_time = SHIFT_TIMINGS.get(shift_code, ("00:00", "23:59"))
         
-        # Check for existing shift
-        existing_shift = mongo.db.shifts.find_one({
-            "date": date_str,
-            "user_id": ObjectId(user_id)
-        })
-        
-        if existing_shift:
-            # Update existing shift
-            mongo.db.shifts.update_one(
-                {"_id": existing_shift["_id"]},
-                {
-                    "$set": {
-                        "shift_code": shift_code,
-                        "start_time": start_time,
-                        "end_time": end_time,
-                        "task": f"{type_val.title()} - {reason}",
-                        "updated_at": datetime.utcnow(),
-                    }
-                }
-            )
+        # Update the existing shift for this date or create a new one
+        result = mongo.db.shifts.update_one(
+            {"user_id": ObjectId(user_id), "date": date_str},
+            {
+                "$set": {
+                    "shift_code": shift_code,
+                    "start_time": start_time,
+                    "end_time": end_time,
+                    "task": f"{type_val.title()} - {reason}",
+                    "updated_at": now,
+                },
+                "$setOnInsert": {
+                    "project_id": None,
+                    "created_at": now,
+                },
+            },
+            upsert=True,
+        )
+        if result.upserted_id is None:
             flash(f"{type_val.title()} updated successfully.", "success")
         else:
-            # Create new shift
-            mongo.db.shifts.insert_one({
-                "date": date_str,
-                "user_id": ObjectId(user_id),
-                "shift_code": shift_code,
-                "start_time": start_time,
-                "end_time": end_time,
-                "task": f"{type_val.title()} - {reason}",
-                "project_id": None,
-                "created_at": datetime.utcnow(),
-                "updated_at": datetime.utcnow(),
-            })
             flash(f"{type_val.title()} assigned successfully.", "success")
         
         # Send notification
-        mongo.db.notifications.insert_one({
+        _notify({
             "user_id": ObjectId(user_id),
             "message": f"You have been assigned {type_val} on {date_str}.",
-            "created_at": datetime.utcnow(),
+            "created_at": now,
             "read": False,
         })
         
@@ -1872,18 +2020,21 @@ def profile():
     if request.method == "POST":
         file = request.files.get("profile_picture")
 
-        if file and allowed_file(file.filename):
+        # Check the actual content, not the client-supplied extension
+        if file and sniff_image_type(file.stream) in ALLOWED_IMAGE_TYPES:
             filename = secure_filename(f"{user_id}.jpg")
             filepath = os.path.join(current_app.config["UPLOAD_FOLDER"], filename)
-            file.save(filepath)
 
-            mongo.db.users.update_one(
-                {"_id": user_id},
-                {"$set": {"profile_picture": filename}}
-            )
+            if save_profile_picture(file, filepath):
+                mongo.db.users.update_one(
+                    {"_id": user_id},
+                    {"$set": {"profile_picture": filename}}
+                )
+                users_cache.invalidate("profiles")
+                user_emails_cache.invalidate(user["email"])
 
-            flash("Profile picture updated!", "success")
-            return redirect("/manager/profile")
+                flash("Profile picture updated!", "success")
+                return redirect("/manager/profile")
 
         flash("Invalid image file type.", "danger")
 
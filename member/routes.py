@@ -1,16 +1,21 @@
 import os
-import io
+import re
+import tempfile
 from datetime import datetime, timedelta, date
 
 from bson.objectid import ObjectId
+from pymongo import WriteConcern
 from werkzeug.utils import secure_filename
 from flask import (
     render_template, request,
     redirect, url_for, flash, session,
-    jsonify, Response, current_app
+    jsonify, current_app, send_file, g
 )
 
 from extensions import mongo
+from core.json_provider import gzip_json_array, gzipped_json_response, stream_json_array
+from core.cache import membership_cache, team_events_cache, user_emails_cache, users_cache
+from services.shift_log_service import ShiftLogService
 from . import member_bp
 
 
@@ -35,9 +40,19 @@ try:
     from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
     from reportlab.lib.units import inch
     REPORTLAB_AVAILABLE = True
+
+    # Report styles are immutable, so build them once rather than per export
+    PDF_TITLE_STYLE = getSampleStyleSheet()["Heading1"]
+    PDF_TABLE_STYLE = TableStyle([
+        ("BACKGROUND", (0,0), (-1,0), colors.lightblue),
+        ("GRID", (0,0), (-1,-1), 1, colors.black)
+    ])
 except ImportError:
     REPORTLAB_AVAILABLE = False
 
+# PDF exports stay in memory up to this size before spilling to disk
+PDF_SPOOL_MAX_SIZE = 8 * 1024 * 1024  # 8MB
+
 
 # --------------------------------------------------
 # MEMBER LOGIN CHECK
@@ -50,6 +65,9 @@ def member_required(f):
         if "user_id" not in session or session.get("role") != "member":
             flash("Please login as a team member first.", "danger")
             return redirect("/login")
+        # Parse the session id once per request; routes read g.user_oid/g.user_sid
+        g.user_sid = session["user_id"]
+        g.user_oid = ObjectId(g.user_sid)
         return f(*args, **kwargs)
 
     return decorated
@@ -66,6 +84,24 @@ SHIFT_COLORS = {
     "W": "#6c757d",  # Gray (Weekoff)
     "L": "#dc3545",  # Red (Leave)
 }
+DEFAULT_COLOR = "#0dcaf0"
+
+# Display labels for codes that aren't shown as-is
+SHIFT_LABELS = {"W": "Weekoff", "L": "Leave"}
+
+# Weekoff/leave render as all-day events
+ALL_DAY_CODES = frozenset({"W", "L"})
+
+
+def by_shift_code(mapping, default):
+    """$switch expression mapping `$_code` through `mapping`."""
+    return {"$switch": {
+        "branches": [
+            {"case": {"$eq": ["$_code", code]}, "then": value}
+            for code, value in mapping.items()
+        ],
+        "default": default,
+    }}
 
 
 # --------------------------------------------------
@@ -76,76 +112,281 @@ def get_member_project_ids_for_user(user_id_obj: ObjectId):
     Finds project membership via:
     1. user.project_ids
     2. shifts belonging to the user
+    Returns a frozenset for O(1) membership checks; wrap it in list() for
+    $in. Cached per member for a few seconds across requests.
     """
-    project_ids = set()
+    return membership_cache.get_or_set(
+        user_id_obj, lambda: _load_member_project_ids(user_id_obj)
+    )
 
-    user = mongo.db.users.find_one({"_id": user_id_obj}) or {}
-    raw = user.get("project_ids", [])
 
-    for pid in raw:
-        try:
-            project_ids.add(ObjectId(pid))
-        except:
-            pass
+def _to_object_id(expr):
+    """$convert expr to an ObjectId; legacy string ids convert, junk becomes null."""
+    return {"$convert": {"input": expr, "to": "objectId", "onError": None, "onNull": None}}
+
+
+def _load_member_project_ids(user_id_obj: ObjectId):
+    # The user's project_ids and the distinct projects of their shifts,
+    # fetched together in one round trip and normalized to ObjectIds
+    # server-side, so no per-id conversion is needed here
+    user = next(mongo.db.users.aggregate([
+        {"$match": {"_id": user_id_obj}},
+        {"$project": {"project_ids": {"$map": {
+            "input": {"$ifNull": ["$project_ids", []]},
+            "in": _to_object_id("$$this"),
+        }}}},
+        {"$lookup": {
+            "from": "shifts",
+            "localField": "_id",
+            "foreignField": "user_id",
+            "pipeline": [{"$group": {"_id": _to_object_id("$project_id")}}],
+            "as": "shift_projects",
+        }},
+    ]), {})
+
+    project_ids = set(user.get("project_ids", []))
+    project_ids.update(sp["_id"] for sp in user.get("shift_projects", []))
+    project_ids.discard(None)
+    return frozenset(project_ids)
+
+
+def unjournaled(collection):
+    """
+    Collection handle that waits for the primary's ack but not its journal
+    sync, keeping fsync latency off user-facing request submissions.
+    """
+    return collection.with_options(write_concern=WriteConcern(w=1, j=False))
 
-    # Add shifts' projects
-    shift_projects = mongo.db.shifts.distinct("project_id", {"user_id": user_id_obj})
-    for pid in shift_projects:
-        if pid:
-            try:
-                project_ids.add(ObjectId(pid))
-            except:
-                pass
 
-    return list(project_ids)
-# --------------------------------------------------
-# MEMBER DASHBOARD
-# --------------------------------------------------
-@member_bp.route("/dashboard", endpoint="dashboard")
-@member_required
-def dashboard():
-    user_id = ObjectId(session["user_id"])
-    current_user = mongo.db.users.find_one({"_id": user_id}) or {}
+def calendar_range_filter():
+    """
+    Shift date filter for the `start`/`end` params FullCalendar sends with
+    every event fetch. Starts one day early so overnight C shifts from the
+    previous day still show. When the params are absent/invalid it only
+    skips shifts without a date.
+    """
+    has_date = {"date": {"$gt": ""}}
+    start = request.args.get("start")
+    end = request.args.get("end")
+    if not start or not end:
+        return has_date
+    try:
+        start_day = date.fromisoformat(start[:10]) - timedelta(days=1)
+        end_day = date.fromisoformat(end[:10])
+    except ValueError:
+        return has_date
+    # Dates are stored as YYYY-MM-DD strings, so string comparison is by day
+    return {"date": {"$gte": start_day.isoformat(), "$lt": end_day.isoformat()}}
+
+
+# $project fields computing a shift's FullCalendar start/end on the server;
+# overnight C shifts end on the following day
+EVENT_BOUNDS = {
+    "start": {"$concat": [
+        "$date", "T", {"$ifNull": ["$start_time", "09:00"]}, ":00",
+    ]},
+    "end": {"$concat": [
+        {"$cond": [
+            {"$eq": ["$shift_code", "C"]},
+            {"$dateToString": {
+                "format": "%Y-%m-%d",
+                "date": {"$dateAdd": {
+                    "startDate": {"$dateFromString": {
+                        "dateString": "$date", "format": "%Y-%m-%d", "onError": None,
+                    }},
+                    "unit": "day",
+                    "amount": 1,
+                }},
+            }},
+            "$date",
+        ]},
+        "T", {"$ifNull": ["$end_time", "17:00"]}, ":00",
+    ]},
+}
 
-    upcoming_raw = list(
-        mongo.db.shifts.find({"user_id": user_id}).sort("date", 1)
-    )
 
-    upcoming = []
-    for s in upcoming_raw:
-        s["_id"] = str(s["_id"])
-        s["user_id"] = str(s["user_id"])
-        s["project_id"] = str(s.get("project_id", "")) if s.get("project_id") else ""
-        upcoming.append(s)
+def shifts_with_names_pipeline(match, limit=None):
+    """
+    Pipeline for shifts matching `match`, sorted by date, with the member's
+    name and the project's name joined in by MongoDB as `user_name` /
+    `user_email` / `project_name`. `limit` caps the rows before the joins.
+    `_id`, `user_id` and `project_id` come back as strings.
+    """
+    return [
+        {"$match": match},
+        {"$sort": {"date": 1}},
+        *([{"$limit": limit}] if limit else []),
+        {"$lookup": {
+            "from": "users",
+            "localField": "user_id",
+            "foreignField": "_id",
+            "pipeline": [{"$project": {"name": 1, "email": 1}}],
+            "as": "u",
+        }},
+        {"$lookup": {
+            "from": "projects",
+            "localField": "project_id",
+            "foreignField": "_id",
+            "pipeline": [{"$project": {"name": 1}}],
+            "as": "p",
+        }},
+        # Ids are emitted as strings, ready for the JSON events
+        {"$project": {
+            "_id": {"$toString": "$_id"},
+            "date": 1,
+            "shift_code": 1,
+            "start_time": 1,
+            "end_time": 1,
+            "task": 1,
+            "user_id": {"$toString": "$user_id"},
+            "project_id": {"$toString": "$project_id"},
+            "user_name": {"$ifNull": [{"$arrayElemAt": ["$u.name", 0]}, "Unknown"]},
+            "user_email": {"$ifNull": [{"$arrayElemAt": ["$u.email", 0]}, ""]},
+            "project_name": {"$ifNull": [{"$arrayElemAt": ["$p.name", 0]}, "General"]},
+            **EVENT_BOUNDS,
+        }},
+    ]
+
+
+def shifts_with_names(match, limit=None):
+    """Cursor over shifts_with_names_pipeline(match, limit)."""
+    return mongo.db.shifts.aggregate(shifts_with_names_pipeline(match, limit))
 
-    upcoming_list = upcoming[:5]
-    all_shifts = upcoming
 
-    projects_map = {
-        str(p["_id"]): p.get("name", "")
-        for p in mongo.db.projects.find()
+def visible_shifts_query(user_id_obj: ObjectId):
+    """
+    Shifts a member may see: their own plus every shift in their projects.
+    """
+    project_ids = get_member_project_ids_for_user(user_id_obj)
+    if not project_ids:
+        return {"user_id": user_id_obj}
+    return {
+        "$or": [
+            {"user_id": user_id_obj},
+            {"project_id": {"$in": list(project_ids)}},
+        ]
     }
 
-    notifications = list(
-        mongo.db.notifications.find({"user_id": user_id})
-        .sort("created_at", -1)
-        .limit(5)
-    )
 
-    project_ids = get_member_project_ids_for_user(user_id)
+def calendar_event_stages(user_id, user_name, is_mine, tooltip_name=None):
+    """
+    Pipeline stages turning shift rows with string `_id`, `project_name` and
+    server-computed `start`/`end` (as produced by shifts_with_names_pipeline /
+    api_my_shifts) into finished FullCalendar events.
+    Arguments are aggregation expressions; pass plain strings for constants.
+    """
+    tooltip = [tooltip_name or user_name, " • ", "$project_name", " • ", "$_label",
+               {"$cond": [{"$eq": ["$_task", ""]}, "", {"$concat": [" • ", "$_task"]}]}]
+    return [
+        {"$addFields": {
+            "_code": {"$ifNull": ["$shift_code", ""]},
+            "_task": {"$ifNull": ["$task", ""]},
+            "_mine": is_mine,
+        }},
+        {"$addFields": {
+            "_label": by_shift_code(SHIFT_LABELS, "$_code"),
+            "_color": by_shift_code(SHIFT_COLORS, DEFAULT_COLOR),
+        }},
+        {"$project": {
+            "_id": 0,
+            "id": "$_id",
+            "title": {"$concat": ["$project_name", ": ", user_name, " – ", "$_label"]},
+            "start": 1,
+            "end": 1,
+            "backgroundColor": "$_color",
+            "borderColor": {"$cond": ["$_mine", "#ff0000", "$_color"]},
+            "borderWidth": {"$cond": ["$_mine", 3, 1]},
+            "allDay": {"$in": ["$_code", list(ALL_DAY_CODES)]},
+            "extendedProps": {
+                "user_id": user_id,
+                "user": user_name,
+                "project": "$project_name",
+                "task": "$_task",
+                "shift_code": "$_code",
+                "tooltip": {"$concat": tooltip},
+                "is_my_shift": "$_mine",
+            },
+        }},
+    ]
+
 
-    projects = []
-    for p in mongo.db.projects.find({"_id": {"$in": project_ids}}):
-        projects.append({"_id": str(p["_id"]), "name": p.get("name", "")})
+def team_shifts_response(current_user_id: ObjectId):
+    """
+    FullCalendar events for every shift the member can see, limited to the
+    calendar's visible window. The gzipped payload is cached briefly, so
+    refetches (view switches, several tabs) skip the query and the encode.
+    """
+    def build():
+        query = visible_shifts_query(current_user_id)
+        query.update(calendar_range_filter())
+        # Events come back from MongoDB fully built; they're only encoded here
+        return gzip_json_array(mongo.db.shifts.aggregate(
+            shifts_with_names_pipeline(query)
+            + calendar_event_stages(
+                "$user_id", "$user_name",
+                {"$eq": ["$user_id", str(current_user_id)]},
+            )
+        ))
+
+    key = (current_user_id, request.args.get("start"), request.args.get("end"))
+    return gzipped_json_response(team_events_cache.get_or_set(key, build))
+
+
+# --------------------------------------------------
+# MEMBER DASHBOARD
+# --------------------------------------------------
+@member_bp.route("/dashboard", endpoint="dashboard")
+@member_required
+def dashboard():
+    user_id = g.user_oid
+    project_ids = list(get_member_project_ids_for_user(user_id))
+
+    # Every widget on the page comes back from a single round trip
+    page = next(mongo.db.users.aggregate([
+        {"$match": {"_id": user_id}},
+        {"$project": {"_id": 1}},
+        {"$lookup": {
+            "from": "shifts",
+            "localField": "_id",
+            "foreignField": "user_id",
+            "pipeline": [
+                {"$sort": {"date": 1}},
+                {"$limit": 5},
+                {"$project": {"_id": 0, "date": 1, "shift_code": 1, "start_time": 1, "end_time": 1}},
+            ],
+            "as": "upcoming",
+        }},
+        {"$lookup": {
+            "from": "notifications",
+            "localField": "_id",
+            "foreignField": "user_id",
+            "pipeline": [
+                {"$sort": {"created_at": -1}},
+                {"$limit": 5},
+                {"$project": {"message": 1, "created_at": 1, "read": 1}},
+            ],
+            "as": "notifications",
+        }},
+        {"$lookup": {
+            "from": "projects",
+            "pipeline": [
+                {"$match": {"_id": {"$in": project_ids}}},
+                {"$project": {"_id": {"$toString": "$_id"}, "name": {"$ifNull": ["$name", ""]}}},
+            ],
+            "as": "projects",
+        }},
+    ]), {})
+
+    upcoming = page.get("upcoming", [])
+    notifications = page.get("notifications", [])
+    projects = page.get("projects", [])
 
     return render_template(
         "member/dashboard.html",
-        upcoming=upcoming_list,
-        all_shifts=all_shifts,
-        projects_map=projects_map,
+        upcoming=upcoming,
         notifications=notifications,
         projects=projects,
-        current_user_id=str(user_id),
+        current_user_id=g.user_sid,
     )
 
 
@@ -155,51 +396,54 @@ def dashboard():
 @member_bp.route("/my-schedule", endpoint="my_schedule")
 @member_required
 def my_schedule():
-    current_user_id = ObjectId(session["user_id"])
+    current_user_id = g.user_oid
 
     project_ids = get_member_project_ids_for_user(current_user_id)
 
+    # Projects and each project's members in one round trip
     projects = []
+    members_by_project = {}
     if project_ids:
-        for p in mongo.db.projects.find({"_id": {"$in": project_ids}}).sort("name", 1):
-            p["_id"] = str(p["_id"])
+        for p in mongo.db.projects.aggregate([
+            {"$match": {"_id": {"$in": list(project_ids)}}},
+            {"$sort": {"name": 1}},
+            {"$lookup": {
+                "from": "users",
+                "localField": "_id",
+                "foreignField": "project_ids",
+                "pipeline": [
+                    {"$match": {"role": "member"}},
+                    {"$project": {"name": 1, "email": 1}},
+                ],
+                "as": "members",
+            }},
+            {"$project": {"name": 1, "members": 1}},
+        ]):
+            pid = str(p["_id"])
+            members_by_project[pid] = p.pop("members")
+            p["_id"] = pid
             projects.append(p)
 
     selected_project = request.args.get("project_id")
-    selected_pid_obj = None
-
-    if selected_project:
-        try:
-            selected_pid_obj = ObjectId(selected_project)
-            if selected_pid_obj not in project_ids:
-                selected_pid_obj = None
-        except:
-            selected_pid_obj = None
-
-    if not selected_pid_obj and projects:
-        selected_pid_obj = ObjectId(projects[0]["_id"])
-        selected_project = projects[0]["_id"]
+    if selected_project not in members_by_project:
+        selected_project = projects[0]["_id"] if projects else None
 
     # TEAM MEMBERS LIST (PROJECT-WISE)
-    team_members_safe = []
-    if selected_pid_obj:
-        team_members = mongo.db.users.find({
-            "role": "member",
-            "project_ids": selected_pid_obj
-        })
-        for u in team_members:
-            team_members_safe.append({
-                "_id": str(u["_id"]),
-                "name": u.get("name", ""),
-                "email": u.get("email", "")
-            })
+    team_members_safe = [
+        {
+            "_id": str(u["_id"]),
+            "name": u.get("name", ""),
+            "email": u.get("email", "")
+        }
+        for u in members_by_project.get(selected_project, [])
+    ]
 
     return render_template(
         "member/my_schedule.html",
         projects=projects,
         selected_project=selected_project,
         team_members=team_members_safe,
-        current_user_id=str(current_user_id),
+        current_user_id=g.user_sid,
     )
 
 
@@ -209,61 +453,36 @@ def my_schedule():
 @member_bp.route("/api/my_shifts")
 @member_required
 def api_my_shifts():
-    user_id = ObjectId(session["user_id"])
-    shifts = list(mongo.db.shifts.find({"user_id": user_id}).sort("date", 1))
-
-    projects_map = {
-        str(p["_id"]): p.get("name", "General")
-        for p in mongo.db.projects.find()
-    }
-
-    events = []
-    for s in shifts:
-        date_str = s.get("date")
-        if not date_str:
-            continue
-
-        shift_code = s.get("shift_code", "")
-        start_time = s.get("start_time", "09:00")
-        end_time = s.get("end_time", "17:00")
-
-        date_obj = datetime.strptime(date_str, "%Y-%m-%d").date()
-        start = f"{date_str}T{start_time}:00"
-
-        if shift_code == "C":
-            end_date = date_obj + timedelta(days=1)
-            end = f"{end_date.isoformat()}T{end_time}:00"
-        else:
-            end = f"{date_str}T{end_time}:00"
-
-        project_name = projects_map.get(str(s.get("project_id")), "General")
-        task = s.get("task", "")
-        
-        shift_label = "Weekoff" if shift_code == "W" else ("Leave" if shift_code == "L" else shift_code)
-        tooltip = f"You • {project_name} • {shift_label}"
-        if task:
-            tooltip += f" • {task}"
-
-        events.append({
-            "id": str(s["_id"]),
-            "title": f"{project_name}: Me – {shift_label}",
-            "start": start,
-            "end": end,
-            "backgroundColor": SHIFT_COLORS.get(shift_code, "#0dcaf0"),
-            "borderColor": "#ff0000",
-            "borderWidth": 3,
-            "allDay": shift_code in ["W", "L"],  # All day for weekoff/leave
-            "extendedProps": {
-                "user_id": str(user_id),
-                "project": project_name,
-                "task": task,
-                "shift_code": shift_code,
-                "tooltip": tooltip,
-                "is_my_shift": True,
-            }
-        })
-
-    return jsonify(events)
+    user_id = g.user_oid
+    # Join each shift's project name on the server in the same round trip
+    shifts = mongo.db.shifts.aggregate([
+        {"$match": {"user_id": user_id, **calendar_range_filter()}},
+        {"$sort": {"date": 1}},
+        {"$lookup": {
+            "from": "projects",
+            "localField": "project_id",
+            "foreignField": "_id",
+            "pipeline": [{"$project": {"name": 1}}],
+            "as": "project",
+        }},
+        {"$project": {
+            "_id": {"$toString": "$_id"},
+            "date": 1,
+            "start_time": 1,
+            "end_time": 1,
+            "shift_code": 1,
+            "task": 1,
+            "project_name": {
+                "$ifNull": [{"$arrayElemAt": ["$project.name", 0]}, "General"]
+            },
+            **EVENT_BOUNDS,
+        }},
+        *calendar_event_stages(
+            {"$literal": g.user_sid}, "Me", {"$literal": True}, tooltip_name="You",
+        ),
+    ])
+
+    return stream_json_array(shifts)
 
 
 # --------------------------------------------------
@@ -272,237 +491,106 @@ def api_my_shifts():
 @member_bp.route("/api/all_team_shifts")
 @member_required
 def api_all_team_shifts():
-    current_user_id = ObjectId(session["user_id"])
-
-    project_ids = get_member_project_ids_for_user(current_user_id)
-
-    if project_ids:
-        visibility_query = {
-            "$or": [
-                {"user_id": current_user_id},
-                {"project_id": {"$in": project_ids}},
-            ]
-        }
-    else:
-        visibility_query = {"user_id": current_user_id}
-
-    shifts = mongo.db.shifts.find(visibility_query).sort("date", 1)
-
-    users_map = {
-        str(u["_id"]): u.get("name", "Unknown")
-        for u in mongo.db.users.find({"role": "member"})
-    }
-
-    projects_map = {
-        str(p["_id"]): p.get("name", "General")
-        for p in mongo.db.projects.find()
-    }
-
-    events = []
-    for s in shifts:
-        date_str = s.get("date")
-        if not date_str:
-            continue
-
-        uid = str(s.get("user_id"))
-        uname = users_map.get(uid, "Unknown")
-        shift_code = s.get("shift_code", "")
-        task = s.get("task", "")
-
-        start_time = s.get("start_time", "09:00")
-        end_time = s.get("end_time", "17:00")
-
-        date_obj = datetime.strptime(date_str, "%Y-%m-%d").date()
-        start = f"{date_str}T{start_time}:00"
-
-        if shift_code == "C":
-            end = f"{(date_obj + timedelta(days=1)).isoformat()}T{end_time}:00"
-        else:
-            end = f"{date_str}T{end_time}:00"
+    return team_shifts_response(g.user_oid)
 
-        project_name = projects_map.get(str(s.get("project_id")), "General")
 
-        is_my_shift = (uid == str(current_user_id))
-        
-        shift_label = "Weekoff" if shift_code == "W" else ("Leave" if shift_code == "L" else shift_code)
-        tooltip = f"{uname} • {project_name} • {shift_label}"
-        if task:
-            tooltip += f" • {task}"
-
-        events.append({
-            "id": str(s["_id"]),
-            "title": f"{project_name}: {uname} – {shift_label}",
-            "start": start,
-            "end": end,
-            "backgroundColor": SHIFT_COLORS.get(shift_code, "#0dcaf0"),
-            "borderColor": "#ff0000" if is_my_shift else SHIFT_COLORS.get(shift_code, "#0dcaf0"),
-            "borderWidth": 3 if is_my_shift else 1,
-            "allDay": shift_code in ["W", "L"],  # All day for weekoff/leave
-            "extendedProps": {
-                "user_id": uid,
-                "user": uname,
-                "project": project_name,
-                "task": task,
-                "shift_code": shift_code,
-                "tooltip": tooltip,
-                "is_my_shift": is_my_shift
-            }
-        })
-
-    return jsonify(events)
 # --------------------------------------------------
 # API: ALL MEMBERS PLANNED SHIFTS (PROJECT-WISE)
 # --------------------------------------------------
 @member_bp.route("/api/all_members_planned_shifts")
 @member_required
 def api_all_members_planned_shifts():
-    current_user_id_obj = ObjectId(session["user_id"])
-    current_user_id = str(current_user_id_obj)
-
-    project_ids = get_member_project_ids_for_user(current_user_id_obj)
-
-    if project_ids:
-        visibility_query = {
-            "$or": [
-                {"user_id": current_user_id_obj},
-                {"project_id": {"$in": project_ids}},
-            ]
-        }
-    else:
-        visibility_query = {"user_id": current_user_id_obj}
-
-    shifts = mongo.db.shifts.find(visibility_query).sort("date", 1)
-
-    users_map = {
-        str(u["_id"]): u.get("name", "Unknown")
-        for u in mongo.db.users.find({"role": "member"})
-    }
-
-    projects_map = {
-        str(p["_id"]): p.get("name", "General")
-        for p in mongo.db.projects.find()
-    }
-
-    events = []
-    for s in shifts:
-        date_str = s.get("date")
-        if not date_str:
-            continue
+    return team_shifts_response(g.user_oid)
 
-        user_id = str(s.get("user_id"))
-        user_name = users_map.get(user_id, "Unknown")
 
-        shift_code = s.get("shift_code", "")
-        task = s.get("task", "")
-
-        start_time = s.get("start_time", "09:00")
-        end_time = s.get("end_time", "17:00")
-
-        date_obj = datetime.strptime(date_str, "%Y-%m-%d").date()
-        start = f"{date_str}T{start_time}:00"
-        if shift_code == "C":
-            end = f"{(date_obj + timedelta(days=1)).isoformat()}T{end_time}:00"
-        else:
-            end = f"{date_str}T{end_time}:00"
+# --------------------------------------------------
+# API: MEMBER SEARCH (SWAP TARGET AUTOCOMPLETE)
+# --------------------------------------------------
+MEMBER_SEARCH_LIMIT = 20
 
-        project_name = projects_map.get(str(s.get("project_id")), "General")
 
-        is_my_shift = (user_id == current_user_id)
-        
-        shift_label = "Weekoff" if shift_code == "W" else ("Leave" if shift_code == "L" else shift_code)
-        tooltip = f"{user_name} • {project_name} • {shift_label}"
-        if task:
-            tooltip += f" • {task}"
-
-        events.append({
-            "id": str(s["_id"]),
-            "title": f"{project_name}: {user_name} – {shift_label}",
-            "start": start,
-            "end": end,
-            "backgroundColor": SHIFT_COLORS.get(shift_code, "#0dcaf0"),
-            "borderColor": "#ff0000" if is_my_shift else SHIFT_COLORS.get(shift_code, "#0dcaf0"),
-            "borderWidth": 3 if is_my_shift else 1,
-            "allDay": shift_code in ["W", "L"],  # All day for weekoff/leave
-            "extendedProps": {
-                "user_id": user_id,
-                "user": user_name,
-                "project": project_name,
-                "task": task,
-                "shift_code": shift_code,
-                "tooltip": tooltip,
-                "is_my_shift": is_my_shift,
-            }
-        })
+@member_bp.route("/api/search_members")
+@member_required
+def api_search_members():
+    q = (request.args.get("q") or "").strip()
+    if not q:
+        return jsonify([])
+
+    # Case-insensitive prefix match on name or email, excluding yourself
+    prefix = {"$regex": "^" + re.escape(q), "$options": "i"}
+    users = mongo.db.users.find(
+        {
+            "role": "member",
+            "_id": {"$ne": g.user_oid},
+            "$or": [{"name": prefix}, {"email": prefix}],
+        },
+        {"name": 1, "email": 1},
+    ).sort("name", 1).limit(MEMBER_SEARCH_LIMIT)
 
-    return jsonify(events)
+    return jsonify([
+        {"_id": str(u["_id"]), "name": u.get("name", ""), "email": u.get("email", "")}
+        for u in users
+    ])
 
 
 # --------------------------------------------------
 # ALL MEMBERS SHIFTS PAGE (TABLE VIEW + CALENDAR)
 # --------------------------------------------------
+# Safety cap on the list view; the calendar pages through dates on its own
+MAX_LISTED_SHIFTS = 5000
+
+
 @member_bp.route("/all-members-shifts")
 @member_required
 def all_members_shifts():
-    current_user_id_obj = ObjectId(session["user_id"])
-    current_user_id = str(current_user_id_obj)
-
-    project_ids = get_member_project_ids_for_user(current_user_id_obj)
-
-    if project_ids:
-        visibility_query = {
-            "$or": [
-                {"user_id": current_user_id_obj},
-                {"project_id": {"$in": project_ids}},
-            ]
-        }
-    else:
-        visibility_query = {"user_id": current_user_id_obj}
-
-    raw_shifts = list(mongo.db.shifts.find(visibility_query).sort("date", 1))
-
-    users_map = {
-        str(u["_id"]): {
-            "name": u.get("name", "Unknown"),
-            "email": u.get("email", "")
-        }
-        for u in mongo.db.users.find({"role": "member"})
-    }
-
-    projects_map = {
-        str(p["_id"]): p.get("name", "General")
-        for p in mongo.db.projects.find()
-    }
-
-    all_shifts = []
-    for s in raw_shifts:
-        uid = str(s.get("user_id"))
-        uinfo = users_map.get(uid, {"name": "Unknown", "email": ""})
-
-        pid = str(s.get("project_id")) if s.get("project_id") else None
-        pname = projects_map.get(pid, "General") if pid else "General"
-
-        all_shifts.append({
-            "_id": str(s.get("_id")),
+    current_user_id_obj = g.user_oid
+    current_user_id = g.user_sid
+    start_date = request.args.get("start_date", "")
+    end_date = request.args.get("end_date", "")
+
+    visibility_query = visible_shifts_query(current_user_id_obj)
+
+    # Apply the date filter in MongoDB (dates are YYYY-MM-DD strings)
+    date_range = {}
+    try:
+        if start_date:
+            date_range["$gte"] = date.fromisoformat(start_date).isoformat()
+        if end_date:
+            date_range["$lte"] = date.fromisoformat(end_date).isoformat()
+    except ValueError:
+        flash("Invalid date range.", "warning")
+        date_range = {}
+    if date_range:
+        visibility_query["date"] = date_range
+
+    all_shifts = [
+        {
+            "_id": s["_id"],
             "date": s.get("date"),
             "shift_code": s.get("shift_code"),
             "start_time": s.get("start_time", "09:00"),
             "end_time": s.get("end_time", "17:00"),
             "task": s.get("task", ""),
-            "project_id": pid,
-            "project_name": pname,
-            "user_id": uid,
-            "user_name": uinfo["name"],
-            "user_email": uinfo["email"]
-        })
+            "project_id": s["project_id"],
+            "project_name": s["project_name"],
+            "user_id": s["user_id"],
+            "user_name": s["user_name"],
+            "user_email": s["user_email"]
+        }
+        # One extra row tells us whether the cap cut the list short
+        for s in shifts_with_names(visibility_query, limit=MAX_LISTED_SHIFTS + 1)
+    ]
+    truncated = len(all_shifts) > MAX_LISTED_SHIFTS
+    del all_shifts[MAX_LISTED_SHIFTS:]
 
     return render_template(
         "member/all_members_shifts.html",
         all_shifts=all_shifts,
-        projects_map=projects_map,
-        users_map=users_map,
+        truncated=truncated,
+        max_listed=MAX_LISTED_SHIFTS,
         current_user_id=current_user_id,
-        start_date=request.args.get("start_date", ""),
-        end_date=request.args.get("end_date", "")
+        start_date=start_date,
+        end_date=end_date
     )
 
 
@@ -516,72 +604,46 @@ def export_shifts_pdf():
         flash("Install reportlab to enable PDF export.", "warning")
         return redirect("/member/all-members-shifts")
 
-    current_user = ObjectId(session["user_id"])
-    project_ids = get_member_project_ids_for_user(current_user)
-
-    if project_ids:
-        visibility_query = {
-            "$or": [
-                {"user_id": current_user},
-                {"project_id": {"$in": project_ids}},
-            ]
-        }
-    else:
-        visibility_query = {"user_id": current_user}
-
-    shifts = list(mongo.db.shifts.find(visibility_query).sort("date", 1))
+    current_user = g.user_oid
+    visibility_query = visible_shifts_query(current_user)
 
-    users_map = {
-        str(u["_id"]): u.get("name", "Unknown")
-        for u in mongo.db.users.find({"role": "member"})
-    }
-
-    projects_map = {
-        str(p["_id"]): p.get("name", "General")
-        for p in mongo.db.projects.find()
-    }
+    shifts = shifts_with_names(visibility_query)
 
-    buffer = io.BytesIO()
+    buffer = tempfile.SpooledTemporaryFile(max_size=PDF_SPOOL_MAX_SIZE)
     doc = SimpleDocTemplate(buffer, pagesize=A4)
 
-    styles = getSampleStyleSheet()
-    title = Paragraph("Shift Schedule Report", styles["Heading1"])
+    title = Paragraph("Shift Schedule Report", PDF_TITLE_STYLE)
 
     content = [title, Spacer(1, 12)]
 
     table_data = [["Date", "Member", "Shift", "Time", "Project", "Task"]]
-
-    for s in shifts:
-        uid = str(s.get("user_id"))
-        uname = users_map.get(uid, "Unknown")
-
-        pid = str(s.get("project_id"))
-        pname = projects_map.get(pid, "General")
-
-        table_data.append([
+    table_data.extend(
+        [
             s.get("date"),
-            uname,
+            s["user_name"],
             s.get("shift_code", ""),
             f"{s.get('start_time', '')} - {s.get('end_time', '')}",
-            pname,
+            s["project_name"],
             s.get("task", "") or "-"
-        ])
+        ]
+        for s in shifts
+    )
 
-    table = Table(table_data)
-    table.setStyle(TableStyle([
-        ("BACKGROUND", (0,0), (-1,0), colors.lightblue),
-        ("GRID", (0,0), (-1,-1), 1, colors.black)
-    ]))
+    # Header row repeats on every page of long exports
+    table = Table(table_data, repeatRows=1)
+    table.setStyle(PDF_TABLE_STYLE)
 
     content.append(table)
     doc.build(content)
 
     buffer.seek(0)
 
-    return Response(
-        buffer.getvalue(),
+    # send_file streams the file in blocks and closes it when done
+    return send_file(
+        buffer,
         mimetype="application/pdf",
-        headers={"Content-Disposition": "attachment; filename=shift_schedule.pdf"}
+        as_attachment=True,
+        download_name="shift_schedule.pdf",
     )
 
 
@@ -591,10 +653,10 @@ def export_shifts_pdf():
 @member_bp.route("/request-change", methods=["GET", "POST"])
 @member_required
 def request_shift_change():
-    user_id = ObjectId(session["user_id"])
+    user_id = g.user_oid
 
     if request.method == "POST":
-        mongo.db.shift_change_requests.insert_one({
+        unjournaled(mongo.db.shift_change_requests).insert_one({
             "user_id": user_id,
             "date": request.form["date"],
             "requested_shift": request.form["new_shift"],
@@ -615,11 +677,10 @@ def request_shift_change():
 @member_bp.route("/request-swap", methods=["GET", "POST"])
 @member_required
 def request_swap():
-    user_id = ObjectId(session["user_id"])
-    users = list(mongo.db.users.find({"role": "member"}))
+    user_id = g.user_oid
 
     if request.method == "POST":
-        mongo.db.shift_swap_requests.insert_one({
+        unjournaled(mongo.db.shift_swap_requests).insert_one({
             "requester_id": user_id,
             "target_user_id": ObjectId(request.form["target_user"]),
             "date": request.form["date"],
@@ -631,7 +692,6 @@ def request_swap():
         return redirect("/member/dashboard")
 
     return render_template("member/request_swap.html",
-                           users=users,
                            today_date=date.today().isoformat())
 
 
@@ -641,7 +701,7 @@ def request_swap():
 @member_bp.route("/request-weekoff", methods=["GET", "POST"])
 @member_required
 def request_weekoff():
-    user_id = ObjectId(session["user_id"])
+    user_id = g.user_oid
 
     if request.method == "POST":
         date_str = request.form.get("date")
@@ -655,7 +715,7 @@ def request_weekoff():
         existing_shift = mongo.db.shifts.find_one({
             "date": date_str,
             "user_id": user_id
-        })
+        }, {"_id": 1})
         
         if existing_shift:
             flash(f"You already have a shift assigned on {date_str}. Please contact manager.", "warning")
@@ -667,7 +727,7 @@ def request_weekoff():
             "date": date_str,
             "type": "weekoff",
             "status": "pending"
-        })
+        }, {"_id": 1})
         
         if existing_request:
             flash("You already have a pending weekoff request for this date.", "warning")
@@ -695,7 +755,7 @@ def request_weekoff():
 @member_bp.route("/request-leave", methods=["GET", "POST"])
 @member_required
 def request_leave():
-    user_id = ObjectId(session["user_id"])
+    user_id = g.user_oid
 
     if request.method == "POST":
         date_str = request.form.get("date")
@@ -709,7 +769,7 @@ def request_leave():
         existing_shift = mongo.db.shifts.find_one({
             "date": date_str,
             "user_id": user_id
-        })
+        }, {"_id": 1})
         
         if existing_shift:
             flash(f"You already have a shift assigned on {date_str}. Please contact manager.", "warning")
@@ -721,7 +781,7 @@ def request_leave():
             "date": date_str,
             "type": "leave",
             "status": "pending"
-        })
+        }, {"_id": 1})
         
         if existing_request:
             flash("You already have a pending leave request for this date.", "warning")
@@ -749,7 +809,7 @@ def request_leave():
 @member_bp.route("/profile", methods=["GET", "POST"])
 @member_required
 def profile():
-    user_id = ObjectId(session["user_id"])
+    user_id = g.user_oid
     user = mongo.db.users.find_one({"_id": user_id})
 
     if request.method == "POST":
@@ -763,6 +823,9 @@ def profile():
             mongo.db.users.update_one(
                 {"_id": user_id}, {"$set": {"profile_picture": filename}}
             )
+            users_cache.invalidate("profiles")
+            if user:
+                user_emails_cache.invalidate(user["email"])
 
             flash("Profile updated.", "success")
             return redirect("/member/profile")
@@ -782,12 +845,12 @@ def profile():
 @member_bp.route("/task-handover", methods=["GET", "POST"])
 @member_required
 def task_handover():
-    current_user_id = ObjectId(session["user_id"])
+    current_user_id = g.user_oid
     project_ids = get_member_project_ids_for_user(current_user_id)
 
     projects = [
         {"_id": str(p["_id"]), "name": p.get("name")}
-        for p in mongo.db.projects.find({"_id": {"$in": project_ids}})
+        for p in mongo.db.projects.find({"_id": {"$in": list(project_ids)}}, {"name": 1})
     ]
 
     selected_project = request.args.get("project_id") or ""
@@ -795,17 +858,23 @@ def task_handover():
 
     task_entries = []
 
-    if selected_project:
-        try:
-            selected_pid = ObjectId(selected_project)
-            task_entries = list(
-                mongo.db.shift_logs.find({
-                    "project_id": str(selected_pid),
-                    "date": selected_date
-                }).sort("created_at", -1)
-            )
-        except:
-            pass
+    if ObjectId.is_valid(selected_project) and ObjectId(selected_project) in project_ids:
+        # Each entry's author joined in by MongoDB, projected to the name
+        task_entries = list(mongo.db.shift_logs.aggregate([
+            {"$match": {
+                "project_id": ObjectId(selected_project),
+                "date": selected_date
+            }},
+            {"$sort": {"created_at": -1}},
+            {"$lookup": {
+                "from": "users",
+                "localField": "user_id",
+                "foreignField": "_id",
+                "pipeline": [{"$project": {"name": 1}}],
+                "as": "author",
+            }},
+            {"$unwind": {"path": "$author", "preserveNullAndEmptyArrays": True}},
+        ]))
 
     if request.method == "POST":
         pid = request.form["project_id"]
@@ -814,17 +883,24 @@ def task_handover():
         comp = request.form["task_completed"]
         todo = request.form["task_to_do"]
 
-        mongo.db.shift_logs.insert_one({
-            "project_id": pid,
+        if not ObjectId.is_valid(pid):
+            flash("Please select a valid project.", "danger")
+            return redirect("/member/task-handover")
+
+        counts = ShiftLogService().bulk_upsert([{
+            "project_id": ObjectId(pid),
             "date": dt,
             "shift_code": sc,
             "user_id": current_user_id,
             "works_completed": comp,
             "works_to_do": todo,
-            "created_at": datetime.utcnow(),
-        })
-
-        flash("Task logged.", "success")
+        }])
+        if counts["updated"]:
+            flash("You already logged a handover for this shift; it has been updated.", "info")
+        elif counts["inserted"]:
+            flash("Task logged.", "success")
+        else:
+            flash("Could not save the handover. Please try again.", "danger")
         return redirect(f"/member/task-handover?project_id={pid}&date={dt}")
 
     return render_template(
@@ -842,12 +918,12 @@ def task_handover():
 @member_bp.route("/view-shift-log")
 @member_required
 def view_shift_log():
-    current_user_id = ObjectId(session["user_id"])
+    current_user_id = g.user_oid
     project_ids = get_member_project_ids_for_user(current_user_id)
 
     projects = [
         {"_id": str(p["_id"]), "name": p.get("name")}
-        for p in mongo.db.projects.find({"_id": {"$in": project_ids}})
+        for p in mongo.db.projects.find({"_id": {"$in": list(project_ids)}}, {"name": 1})
     ]
 
     selected_project = request.args.get("project_id") or ""
@@ -855,32 +931,36 @@ def view_shift_log():
 
     log_entries = []
 
-    if selected_project:
-        try:
-            pid = ObjectId(selected_project)
-            shifts = list(
-                mongo.db.shifts.find({
-                    "project_id": pid,
-                    "date": selected_date
-                })
-            )
-            shift_ids = [str(s["_id"]) for s in shifts]
-
-            log_entries_raw = list(
-                mongo.db.shift_logs.find({"shift_id": {"$in": shift_ids}})
-            )
-
-            users_map = {
-                str(u["_id"]): u for u in mongo.db.users.find()
-            }
-
-            for log in log_entries_raw:
-                author = users_map.get(str(log.get("user_id")), {})
-                log["author"] = author
-                log_entries.append(log)
-
-        except:
-            pass
+    if ObjectId.is_valid(selected_project) and ObjectId(selected_project) in project_ids:
+        # One round trip: the day's logs with their author and the author's
+        # shift on that date joined in by MongoDB
+        log_entries = list(mongo.db.shift_logs.aggregate([
+            {"$match": {"project_id": ObjectId(selected_project), "date": selected_date}},
+            {"$sort": {"created_at": -1}},
+            {"$lookup": {
+                "from": "users",
+                "localField": "user_id",
+                "foreignField": "_id",
+                "pipeline": [{"$project": {"name": 1, "email": 1}}],
+                "as": "user",
+            }},
+            # Equality join on user_id plus a date match, served by the
+            # shifts (user_id, date) index
+            {"$lookup": {
+                "from": "shifts",
+                "localField": "user_id",
+                "foreignField": "user_id",
+                "let": {"d": "$date"},
+                "pipeline": [
+                    {"$match": {"$expr": {"$eq": ["$date", "$$d"]}}},
+                    {"$limit": 1},
+                    {"$project": {"shift_code": 1, "start_time": 1, "end_time": 1}},
+                ],
+                "as": "shift",
+            }},
+            {"$unwind": {"path": "$user", "preserveNullAndEmptyArrays": True}},
+            {"$unwind": {"path": "$shift", "preserveNullAndEmptyArrays": True}},
+        ]))
 
     return render_template(
         "member/view_shift_log.html",
@@ -4,7 +4,10 @@ from flask import (
 )
 from bson.objectid import ObjectId
 from datetime import datetime
+from pymongo.errors import DuplicateKeyError
 from extensions import mongo
+from core.cache import membership_cache, projects_cache, user_names
+from services import ProjectService
 
 project_bp = Blueprint("project", __name__)
 
@@ -50,8 +53,10 @@ SHIFT_TIMINGS = {
 @project_bp.route("/", endpoint="list_projects")
 @manager_required
 def list_projects():
-    projects = mongo.db.projects.find().sort("created_at", -1)
-    projects = list(projects)
+    # The template iterates once, so hand it the cursor and let it stream
+    projects = mongo.db.projects.find(
+        {}, {"name": 1, "description": 1, "start_date": 1, "end_date": 1, "created_at": 1}
+    ).sort("created_at", -1).batch_size(100)
     return render_template("project/list_projects.html", projects=projects)
 
 
@@ -74,6 +79,7 @@ def create_project():
             "end_date": end_date,
             "created_at": datetime.utcnow()
         })
+        projects_cache.invalidate()
 
         flash("Project created!", "success")
         return redirect(url_for("project.list_projects"))
@@ -87,17 +93,18 @@ def create_project():
 @project_bp.route("/view/<project_id>", endpoint="view_project")
 @login_required
 def view_project(project_id):
-    project = mongo.db.projects.find_one({"_id": ObjectId(project_id)})
+    # Project, tasks and shifts in one round trip
+    project = ProjectService().get_project_overview(project_id, include_members=False)
     if not project:
         flash("Project not found.", "danger")
         if session.get("role") == "manager":
             return redirect(url_for("project.list_projects"))
         return redirect(url_for("member.dashboard"))
     
-    tasks = list(mongo.db.project_tasks.find({"project_id": ObjectId(project_id)}))
-    shifts = list(mongo.db.shifts.find({"project_id": ObjectId(project_id)}).sort("date", 1))
+    tasks = project.pop("tasks")
+    shifts = project.pop("shifts")
     
-    users_map = {str(u["_id"]): u["name"] for u in mongo.db.users.find()}
+    users_map = user_names()
     
     is_manager = session.get("role") == "manager"
     
@@ -117,7 +124,8 @@ def view_project(project_id):
 @project_bp.route("/edit/<project_id>", methods=["GET", "POST"], endpoint="edit_project")
 @manager_required
 def edit_project(project_id):
-    project = mongo.db.projects.find_one({"_id": ObjectId(project_id)})
+    pid = ObjectId(project_id)
+    project = mongo.db.projects.find_one({"_id": pid})
     if not project:
         flash("Project not found.", "danger")
         return redirect(url_for("project.list_projects"))
@@ -129,7 +137,7 @@ def edit_project(project_id):
         end_date = request.form.get("end_date")
 
         mongo.db.projects.update_one(
-            {"_id": ObjectId(project_id)},
+            {"_id": pid},
             {
                 "$set": {
                     "name": name,
@@ -140,6 +148,7 @@ def edit_project(project_id):
                 }
             }
         )
+        projects_cache.invalidate()
 
         flash("Project updated!", "success")
         return redirect(url_for("project.view_project", project_id=project_id))
@@ -153,7 +162,8 @@ def edit_project(project_id):
 @project_bp.route("/add-task/<project_id>", methods=["GET", "POST"], endpoint="add_task")
 @manager_required
 def add_task(project_id):
-    project = mongo.db.projects.find_one({"_id": ObjectId(project_id)})
+    pid = ObjectId(project_id)
+    project = mongo.db.projects.find_one({"_id": pid}, {"name": 1})
     if not project:
         flash("Project not found.", "danger")
         return redirect(url_for("project.list_projects"))
@@ -164,7 +174,7 @@ def add_task(project_id):
         due_date = request.form.get("due_date")
         
         mongo.db.project_tasks.insert_one({
-            "project_id": ObjectId(project_id),
+            "project_id": pid,
             "task_name": task_name,
             "assigned_to": ObjectId(assigned_to),
             "due_date": due_date,
@@ -174,7 +184,7 @@ def add_task(project_id):
         flash("Task added successfully!", "success")
         return redirect(url_for("project.view_project", project_id=project_id))
     
-    users = list(mongo.db.users.find({"role": "member"}))
+    users = list(mongo.db.users.find({"role": "member"}, {"name": 1, "email": 1}))
     return render_template("project/add_task.html", project=project, users=users)
 
 
@@ -184,7 +194,8 @@ def add_task(project_id):
 @project_bp.route("/add-shift/<project_id>", methods=["GET", "POST"], endpoint="add_shift")
 @manager_required
 def add_shift(project_id):
-    project = mongo.db.projects.find_one({"_id": ObjectId(project_id)})
+    pid = ObjectId(project_id)
+    project = mongo.db.projects.find_one({"_id": pid}, {"name": 1})
     if not project:
         flash("Project not found.", "danger")
         return redirect(url_for("project.list_projects"))
@@ -197,46 +208,40 @@ def add_shift(project_id):
 
         if not date_str or not user_id or not shift_code:
             flash("Please fill all required fields.", "danger")
-            users = list(mongo.db.users.find({"role": "member"}))
+            users = list(mongo.db.users.find({"role": "member"}, {"name": 1, "email": 1}))
             return render_template("project/add_shift.html", project=project, users=users)
 
         # AUTO TIME from shift code
         start_time, end_time = SHIFT_TIMINGS.get(shift_code, ("09:00", "17:00"))
         
-        # Check for shift conflict
-        existing_shift = mongo.db.shifts.find_one({
-            "date": date_str,
-            "user_id": ObjectId(user_id)
-        })
-        
-        if existing_shift:
-            user = mongo.db.users.find_one({"_id": ObjectId(user_id)})
+        # Create new shift; the unique (user_id, date) index rejects conflicts
+        try:
+            mongo.db.shifts.insert_one({
+                "project_id": pid,
+                "date": date_str,
+                "user_id": ObjectId(user_id),
+                "shift_code": shift_code,
+                "start_time": start_time,
+                "end_time": end_time,
+                "task": task,
+                "created_at": datetime.utcnow(),
+                "updated_at": datetime.utcnow()
+            })
+        except DuplicateKeyError:
+            user = mongo.db.users.find_one({"_id": ObjectId(user_id)}, {"name": 1})
             user_name = user["name"] if user else "Unknown"
             flash(
                 f"Conflict: {user_name} already has a shift on {date_str}. "
                 f"Please choose a different date or user.",
                 "danger"
             )
-            users = list(mongo.db.users.find({"role": "member"}))
+            users = list(mongo.db.users.find({"role": "member"}, {"name": 1, "email": 1}))
             return render_template("project/add_shift.html", project=project, users=users)
         
-        # Create new shift
-        mongo.db.shifts.insert_one({
-            "project_id": ObjectId(project_id),
-            "date": date_str,
-            "user_id": ObjectId(user_id),
-            "shift_code": shift_code,
-            "start_time": start_time,
-            "end_time": end_time,
-            "task": task,
-            "created_at": datetime.utcnow(),
-            "updated_at": datetime.utcnow()
-        })
-        
         flash("Shift added successfully!", "success")
         return redirect(url_for("project.view_project", project_id=project_id))
     
-    users = list(mongo.db.users.find({"role": "member"}))
+    users = list(mongo.db.users.find({"role": "member"}, {"name": 1, "email": 1}))
     return render_template("project/add_shift.html", project=project, users=users)
 
 
@@ -246,19 +251,24 @@ def add_shift(project_id):
 @project_bp.route("/delete/<project_id>", methods=["POST"], endpoint="delete_project")
 @manager_required
 def delete_project(project_id):
-    project = mongo.db.projects.find_one({"_id": ObjectId(project_id)})
+    pid = ObjectId(project_id)
+    project = mongo.db.projects.find_one({"_id": pid}, {"name": 1})
     if not project:
         flash("Project not found.", "danger")
         return redirect(url_for("project.list_projects"))
     
-    mongo.db.project_tasks.delete_many({"project_id": ObjectId(project_id)})
+    mongo.db.project_tasks.delete_many({"project_id": pid})
     
     mongo.db.shifts.update_many(
-        {"project_id": ObjectId(project_id)},
-        {"$set": {"project_id": None}}
+        {"project_id": pid},
+        # Unset rather than null it, so orphaned shifts drop out of the
+        # partial project_id index
+        {"$unset": {"project_id": ""}}
     )
     
-    mongo.db.projects.delete_one({"_id": ObjectId(project_id)})
+    mongo.db.projects.delete_one({"_id": pid})
+    projects_cache.invalidate()
+    membership_cache.invalidate()
     
     flash(f"Project '{project['name']}' deleted successfully!", "success")
     return redirect(url_for("project.list_projects"))
@@ -7,12 +7,14 @@ from .user_service import UserService
 from .shift_service import ShiftService
 from .project_service import ProjectService
 from .notification_service import NotificationService
+from .shift_log_service import ShiftLogService
 
 __all__ = [
     "UserService",
     "ShiftService",
     "ProjectService",
     "NotificationService",
+    "ShiftLogService",
 ]
 
 
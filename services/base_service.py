@@ -2,7 +2,7 @@
 Base service class with common database operations.
 """
 
-from typing import Dict, List, Optional, Any
+from typing import Dict, Iterable, List, Optional, Any
 from bson.objectid import ObjectId
 from extensions import mongo
 from core.base import BaseService as CoreBaseService
@@ -21,27 +21,48 @@ class BaseService(CoreBaseService):
         super().__init__()
         self.collection_name = collection_name
     
-    def find_one(self, query: Dict[str, Any]) -> Optional[Dict[str, Any]]:
-        """Find a single document."""
+    def find_one(self, query: Dict[str, Any], projection: Dict[str, Any] = None) -> Optional[Dict[str, Any]]:
+        """Find a single document, optionally returning only `projection` fields."""
         try:
-            return self.db[self.collection_name].find_one(query)
+            return self.db[self.collection_name].find_one(query, projection)
         except Exception as e:
             logger.error(f"Error finding document in {self.collection_name}: {str(e)}")
             return None
     
-    def find_many(self, query: Dict[str, Any] = None, sort: List[tuple] = None, limit: int = None) -> List[Dict[str, Any]]:
-        """Find multiple documents."""
+    def find_many_cursor(self, query: Dict[str, Any] = None, sort: List[tuple] = None,
+                         limit: int = None, batch_size: int = None,
+                         projection: Dict[str, Any] = None) -> Iterable[Dict[str, Any]]:
+        """
+        Lazy cursor over matching documents; nothing is fetched until it is
+        iterated, and then only one batch at a time.
+        """
+        cursor = self.db[self.collection_name].find(query or {}, projection)
+        if sort:
+            cursor = cursor.sort(sort)
+        if limit:
+            cursor = cursor.limit(limit)
+        if batch_size:
+            cursor = cursor.batch_size(batch_size)
+        return cursor
+    
+    def find_many(self, query: Dict[str, Any] = None, sort: List[tuple] = None, limit: int = None,
+                  batch_size: int = None, projection: Dict[str, Any] = None) -> List[Dict[str, Any]]:
+        """Find multiple documents, optionally returning only `projection` fields."""
         try:
-            cursor = self.db[self.collection_name].find(query or {})
-            if sort:
-                cursor = cursor.sort(sort)
-            if limit:
-                cursor = cursor.limit(limit)
-            return list(cursor)
+            return list(self.find_many_cursor(query, sort=sort, limit=limit, batch_size=batch_size,
+                                              projection=projection))
         except Exception as e:
             logger.error(f"Error finding documents in {self.collection_name}: {str(e)}")
             return []
     
+    def aggregate(self, pipeline: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Run an aggregation pipeline and return the resulting documents."""
+        try:
+            return list(self.db[self.collection_name].aggregate(pipeline))
+        except Exception as e:
+            logger.error(f"Error aggregating documents in {self.collection_name}: {str(e)}")
+            return []
+    
     def find_by_id(self, id: str) -> Optional[Dict[str, Any]]:
         """Find a document by ID."""
         try:
@@ -80,10 +101,19 @@ class BaseService(CoreBaseService):
             logger.error(f"Error deleting document in {self.collection_name}: {str(e)}")
             return False
     
-    def count(self, query: Dict[str, Any] = None) -> int:
-        """Count documents matching query."""
+    def count(self, query: Dict[str, Any] = None, estimated: bool = False, limit: int = None) -> int:
+        """
+        Count documents matching query.
+        estimated=True answers an unfiltered count from collection metadata;
+        limit stops counting early (for "N+" style badges).
+        """
         try:
-            return self.db[self.collection_name].count_documents(query or {})
+            collection = self.db[self.collection_name]
+            if estimated and not query:
+                return collection.estimated_document_count()
+            if limit:
+                return collection.count_documents(query or {}, limit=limit)
+            return collection.count_documents(query or {})
         except Exception as e:
             logger.error(f"Error counting documents in {self.collection_name}: {str(e)}")
             return 0
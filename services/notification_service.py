@@ -5,7 +5,9 @@ Service for notification-related business logic.
 from typing import Dict, List, Optional, Any
 from datetime import datetime
 from bson.objectid import ObjectId
+from pymongo import WriteConcern
 from services.base_service import BaseService
+from core.cache import notifications_cache
 from core.exceptions import ValidationError, NotFoundError
 import logging
 
@@ -19,6 +21,11 @@ class NotificationService(BaseService):
     
     def __init__(self):
         super().__init__("notifications")
+        # Inserts are best-effort UI signals and don't wait for a server ack;
+        # read-state updates keep the default acknowledged concern
+        self._unacked = self.db[self.collection_name].with_options(
+            write_concern=WriteConcern(w=0)
+        )
     
     def create_notification(self, user_id: str, message: str, notification_type: str = None, related_id: str = None) -> Optional[str]:
         """Create a new notification."""
@@ -34,22 +41,40 @@ class NotificationService(BaseService):
         if related_id:
             data["related_id"] = ObjectId(related_id)
         
-        return self.create(data)
+        notifications_cache.invalidate(str(user_id))
+        try:
+            # The _id is assigned client-side, so it is known without an ack
+            return str(self._unacked.insert_one(data).inserted_id)
+        except Exception as e:
+            logger.error(f"Error creating notification: {str(e)}")
+            return None
     
     def get_user_notifications(self, user_id: str, unread_only: bool = False, limit: int = None) -> List[Dict[str, Any]]:
-        """Get notifications for a user."""
-        query = {"user_id": ObjectId(user_id)}
-        if unread_only:
-            query["read"] = False
-        
-        return self.find_many(query, sort=[("created_at", -1)], limit=limit)
+        """
+        Get notifications for a user.
+        Reads are cached for a few seconds per user, since the same lists are
+        requested on every page render; writes through this service clear them.
+        """
+        user_reads = notifications_cache.get_or_set(str(user_id), dict)
+        key = (unread_only, limit)
+        if key not in user_reads:
+            query = {"user_id": ObjectId(user_id)}
+            if unread_only:
+                query["read"] = False
+            # A limited read comes back in a single batch
+            user_reads[key] = self.find_many(query, sort=[("created_at", -1)], limit=limit, batch_size=limit)
+        return list(user_reads[key])
     
     def mark_as_read(self, notification_id: str) -> bool:
         """Mark a notification as read."""
+        notification = self.find_one({"_id": ObjectId(notification_id)}, {"user_id": 1})
+        if notification:
+            notifications_cache.invalidate(str(notification["user_id"]))
         return self.update(notification_id, {"read": True, "read_at": datetime.utcnow()})
     
     def mark_all_as_read(self, user_id: str) -> bool:
         """Mark all notifications as read for a user."""
+        notifications_cache.invalidate(str(user_id))
         try:
             result = self.db[self.collection_name].update_many(
                 {"user_id": ObjectId(user_id), "read": False},
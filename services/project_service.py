@@ -37,4 +37,54 @@ class ProjectService(BaseService):
         from services.shift_service import ShiftService
         shift_service = ShiftService()
         return shift_service.get_shifts_by_project(project_id, start_date, end_date)
+    
+    def get_project_overview(self, project_id: str, start_date: str = None, end_date: str = None,
+                             include_members: bool = True) -> Optional[Dict[str, Any]]:
+        """
+        Get a project with its tasks, shifts (date-sorted) and, optionally,
+        its members attached as "tasks", "shifts" and "members", in a single
+        aggregation. Returns None if the project does not exist.
+        """
+        date_range = {}
+        if start_date:
+            date_range["$gte"] = start_date
+        if end_date:
+            date_range["$lte"] = end_date
+        shift_pipeline = [{"$match": {"date": date_range}}] if date_range else []
+        shift_pipeline += [
+            {"$sort": {"date": 1}},
+            {"$project": {"date": 1, "user_id": 1, "shift_code": 1,
+                          "start_time": 1, "end_time": 1, "task": 1}},
+        ]
+
+        pipeline = [
+            {"$match": {"_id": ObjectId(project_id)}},
+            {"$limit": 1},
+            {"$lookup": {
+                "from": "project_tasks",
+                "localField": "_id",
+                "foreignField": "project_id",
+                "pipeline": [{"$project": {"task_name": 1, "assigned_to": 1,
+                                           "due_date": 1, "created_at": 1}}],
+                "as": "tasks",
+            }},
+            {"$lookup": {
+                "from": "shifts",
+                "localField": "_id",
+                "foreignField": "project_id",
+                "pipeline": shift_pipeline,
+                "as": "shifts",
+            }},
+        ]
+        if include_members:
+            pipeline.append({"$lookup": {
+                "from": "users",
+                "localField": "_id",
+                "foreignField": "project_ids",
+                "pipeline": [{"$project": {"name": 1, "email": 1, "role": 1}}],
+                "as": "members",
+            }})
+
+        results = self.aggregate(pipeline)
+        return results[0] if results else None
 
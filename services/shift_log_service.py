@@ -0,0 +1,55 @@
+"""
+Service for shift handover log business logic.
+"""
+
+from typing import Dict, List, Any
+from datetime import datetime
+from pymongo import UpdateOne
+from services.base_service import BaseService
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Fields that identify the shift a handover entry belongs to
+LOG_KEY_FIELDS = ("user_id", "project_id", "date", "shift_code")
+
+
+class ShiftLogService(BaseService):
+    """
+    Service for managing shift handover logs.
+    """
+
+    def __init__(self):
+        super().__init__("shift_logs")
+
+    def bulk_upsert(self, entries: List[Dict[str, Any]]) -> Dict[str, int]:
+        """
+        Write handover entries in a single round trip.
+        Each entry is keyed by its member/project/date/shift code, so
+        resubmitting a handover for the same shift overwrites its text.
+        Returns counts of entries "inserted" and existing ones "updated";
+        both are 0 if the write failed.
+        """
+        counts = {"inserted": 0, "updated": 0}
+        if not entries:
+            return counts
+
+        now = datetime.utcnow()
+        ops = []
+        for entry in entries:
+            key = {field: entry.get(field) for field in LOG_KEY_FIELDS}
+            fields = {k: v for k, v in entry.items() if k not in LOG_KEY_FIELDS}
+            fields["updated_at"] = now
+            ops.append(UpdateOne(
+                key,
+                {"$set": fields, "$setOnInsert": {"created_at": now}},
+                upsert=True,
+            ))
+
+        try:
+            result = self.db[self.collection_name].bulk_write(ops, ordered=False)
+            counts["inserted"] = result.upserted_count
+            counts["updated"] = result.matched_count
+        except Exception as e:
+            logger.error(f"Error writing shift logs: {str(e)}")
+        return counts
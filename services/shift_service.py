@@ -2,16 +2,20 @@
 Service for shift-related business logic.
 """
 
-from typing import Dict, List, Optional, Any
-from datetime import datetime, timedelta
+from typing import Dict, Iterable, List, Optional, Any
+import re
+from datetime import date, datetime, timedelta
 from bson.objectid import ObjectId
 from services.base_service import BaseService
 from core.exceptions import ValidationError, NotFoundError
-from constants import SHIFT_COLORS, SHIFT_TIMES, VALID_SHIFT_CODES
+from constants import DEFAULT_SHIFT_TIMES, SHIFT_COLORS, SHIFT_TIMES, VALID_SHIFT_CODES
 import logging
 
 logger = logging.getLogger(__name__)
 
+# Zero-padded YYYY-MM-DD, the form dates are stored and compared in
+_DATE_RE = re.compile(r"^(\d{4})-(\d{2})-(\d{2})$")
+
 
 class ShiftService(BaseService):
     """
@@ -32,8 +36,11 @@ class ShiftService(BaseService):
             return False, f"Invalid shift code: {data['shift_code']}"
         
         # Validate date format
+        m = _DATE_RE.match(data["date"])
+        if not m:
+            return False, "Invalid date format. Use YYYY-MM-DD"
         try:
-            datetime.strptime(data["date"], "%Y-%m-%d")
+            date(int(m[1]), int(m[2]), int(m[3]))
         except ValueError:
             return False, "Invalid date format. Use YYYY-MM-DD"
         
@@ -46,11 +53,9 @@ class ShiftService(BaseService):
             raise ValidationError(error)
         
         # Set default times if not provided
-        shift_code = data["shift_code"]
-        if "start_time" not in data:
-            data["start_time"] = SHIFT_TIMES.get(shift_code, {}).get("start", "09:00")
-        if "end_time" not in data:
-            data["end_time"] = SHIFT_TIMES.get(shift_code, {}).get("end", "17:00")
+        start_time, end_time = SHIFT_TIMES.get(data["shift_code"], DEFAULT_SHIFT_TIMES)
+        data.setdefault("start_time", start_time)
+        data.setdefault("end_time", end_time)
         
         # Add timestamps
         data["created_at"] = datetime.utcnow()
@@ -58,8 +63,8 @@ class ShiftService(BaseService):
         
         return self.create(data)
     
-    def get_user_shifts(self, user_id: str, start_date: str = None, end_date: str = None) -> List[Dict[str, Any]]:
-        """Get shifts for a user."""
+    def get_user_shifts(self, user_id: str, start_date: str = None, end_date: str = None) -> Iterable[Dict[str, Any]]:
+        """Get shifts for a user, as a cursor to iterate once."""
         query = {"user_id": ObjectId(user_id)}
         
         if start_date:
@@ -70,7 +75,7 @@ class ShiftService(BaseService):
             else:
                 query["date"] = {"$lte": end_date}
         
-        return self.find_many(query, sort=[("date", 1)])
+        return self.find_many_cursor(query, sort=[("date", 1)])
     
     def get_shifts_by_project(self, project_id: str, start_date: str = None, end_date: str = None) -> List[Dict[str, Any]]:
         """Get shifts for a project."""
@@ -96,7 +101,8 @@ class ShiftService(BaseService):
         if shift_id:
             query["_id"] = {"$ne": ObjectId(shift_id)}
         
-        existing = self.find_one(query)
+        # Existence check only: fetch just the _id
+        existing = self.find_one(query, {"_id": 1})
         return existing is not None
     
     def get_upcoming_shifts(self, user_id: str, limit: int = 5) -> List[Dict[str, Any]]:
@@ -111,7 +117,7 @@ class ShiftService(BaseService):
     def get_all_members_planned_shifts(self, start_date: str = None, end_date: str = None) -> List[Dict[str, Any]]:
         """
         Get all planned shifts for all members.
-        Returns shifts with user information included.
+        Returns shifts with user information included, joined server-side.
         """
         query = {}
         
@@ -123,30 +129,29 @@ class ShiftService(BaseService):
             else:
                 query["date"] = {"$lte": end_date}
         
-        shifts = self.find_many(query, sort=[("date", 1), ("shift_code", 1)])
-        
-        # Get user information for each shift
-        from services.user_service import UserService
-        user_service = UserService()
-        
-        result = []
-        for shift in shifts:
-            user_id = str(shift.get("user_id"))
-            user = user_service.find_by_id(user_id)
-            
-            shift_data = {
-                "_id": str(shift.get("_id")),
-                "date": shift.get("date"),
-                "shift_code": shift.get("shift_code"),
-                "start_time": shift.get("start_time", "09:00"),
-                "end_time": shift.get("end_time", "17:00"),
-                "task": shift.get("task", ""),
-                "project_id": str(shift.get("project_id")) if shift.get("project_id") else None,
-                "user_id": user_id,
-                "user_name": user.get("name", "Unknown") if user else "Unknown",
-                "user_email": user.get("email", "") if user else "",
-            }
-            result.append(shift_data)
-        
-        return result
+        # One round trip: the shift's user is joined in by MongoDB
+        return self.aggregate([
+            {"$match": query},
+            {"$sort": {"date": 1, "shift_code": 1}},
+            {"$lookup": {
+                "from": "users",
+                "localField": "user_id",
+                "foreignField": "_id",
+                "pipeline": [{"$project": {"name": 1, "email": 1}}],
+                "as": "user",
+            }},
+            {"$unwind": {"path": "$user", "preserveNullAndEmptyArrays": True}},
+            {"$project": {
+                "_id": {"$toString": "$_id"},
+                "date": 1,
+                "shift_code": 1,
+                "start_time": {"$ifNull": ["$start_time", "09:00"]},
+                "end_time": {"$ifNull": ["$end_time", "17:00"]},
+                "task": {"$ifNull": ["$task", ""]},
+                "project_id": {"$toString": "$project_id"},
+                "user_id": {"$toString": "$user_id"},
+                "user_name": {"$ifNull": ["$user.name", "Unknown"]},
+                "user_email": {"$ifNull": ["$user.email", ""]},
+            }},
+        ])
 
@@ -2,15 +2,40 @@
 Service for user-related business logic.
 """
 
-from typing import Dict, List, Optional, Any
+import re
+import threading
+from typing import Dict, Iterable, List, Optional, Any, Union
+from bson.errors import InvalidId
 from bson.objectid import ObjectId
+from pymongo.errors import PyMongoError
 from services.base_service import BaseService
-from core.exceptions import ValidationError, NotFoundError
+from core.cache import NO_USER, NO_USER_TTL, user_emails_cache
+from core.exceptions import ValidationError
 from constants import VALID_ROLES
 import logging
 
 logger = logging.getLogger(__name__)
 
+# Documents per cursor batch when streaming user listings
+USER_BATCH_SIZE = 500
+
+# One local part, one "@", and a dotted domain; no whitespace anywhere
+_EMAIL_RE = re.compile(r"^[^@\s]+@[^@\s]+\.[^@\s]+$")
+
+# In-flight get_by_email queries, normalized email -> Event set when done
+_inflight: Dict[str, threading.Event] = {}
+_inflight_lock = threading.Lock()
+
+# Longest a coalesced lookup waits on another thread's query
+INFLIGHT_WAIT_SECONDS = 5
+
+# Credentials never leave the database through get_by_email or its cache
+_EMAIL_LOOKUP_PROJECTION = {"password_hash": 0}
+
+# Fields returned by user listings; credentials and audit fields stay server-side
+USER_LIST_PROJECTION = {"name": 1, "email": 1, "role": 1, "phone": 1,
+                        "project_ids": 1, "profile_picture": 1}
+
 
 class UserService(BaseService):
     """
@@ -30,62 +55,144 @@ class UserService(BaseService):
         if data["role"] not in VALID_ROLES:
             return False, f"Invalid role: {data['role']}"
         
-        # Validate email format (basic)
-        if "@" not in data["email"]:
+        if not _EMAIL_RE.match(data["email"]):
             return False, "Invalid email format"
         
         return True, None
     
     def get_by_email(self, email: str) -> Optional[Dict[str, Any]]:
-        """Get user by email."""
-        return self.find_one({"email": email})
-    
-    def get_users_by_role(self, role: str) -> List[Dict[str, Any]]:
-        """Get all users with a specific role."""
-        return self.find_many({"role": role})
+        """
+        Get user by email, without its password hash.
+        Found users are cached for a few minutes, keyed by the trimmed,
+        lowercased email; each caller gets its own shallow copy. Emails with
+        no user are cached for a shorter time, so repeated misses (typos,
+        enumeration scans) don't each hit the database.
+        """
+        key = email.strip().lower()
+        if not _EMAIL_RE.match(key):
+            return None
+        user = user_emails_cache.get(key)
+        if user is None:
+            user = self._load_by_email(key)
+        if user is None or user is NO_USER:
+            return None
+        return dict(user)
     
-    def get_users_by_project(self, project_id: str) -> List[Dict[str, Any]]:
-        """Get all users assigned to a project."""
+    def _load_by_email(self, key: str) -> Any:
+        """
+        Fetch and cache the user for a normalized email on a cache miss.
+        Concurrent misses for the same email are coalesced: the first
+        thread queries, the others wait for it and read the cache.
+        Returns the user, NO_USER, or None if the lookup failed.
+        """
+        with _inflight_lock:
+            done = _inflight.get(key)
+            leader = done is None
+            if leader:
+                done = _inflight[key] = threading.Event()
+
+        if not leader:
+            done.wait(INFLIGHT_WAIT_SECONDS)
+            user = user_emails_cache.get(key)
+            if user is not None:
+                return user
+            # The leader failed or is slow; fall back to our own query
+
         try:
-            return self.find_many({"project_ids": ObjectId(project_id)})
-        except:
+            # Auth stores emails lowercased, so query with the same key
+            user = self.db[self.collection_name].find_one({"email": key}, _EMAIL_LOOKUP_PROJECTION)
+            if user is None:
+                user = NO_USER
+                user_emails_cache.set(key, user, ttl=NO_USER_TTL)
+            else:
+                user_emails_cache.set(key, user)
+            return user
+        except PyMongoError as e:
+            # Not cached: a failed lookup is not a missing user
+            logger.error(f"Error finding user by email: {str(e)}")
+            return None
+        finally:
+            # Waiters are released only once the cache holds the result
+            if leader:
+                with _inflight_lock:
+                    _inflight.pop(key, None)
+                done.set()
+    
+    def create(self, data: Dict[str, Any]) -> Optional[str]:
+        """Create a user, storing the email in its canonical lowercase form."""
+        if isinstance(data.get("email"), str):
+            data["email"] = data["email"].strip().lower()
+            user_emails_cache.invalidate(data["email"])
+        return super().create(data)
+    
+    def update(self, id: str, data: Dict[str, Any]) -> bool:
+        """Update a user, evicting cached email lookups."""
+        if isinstance(data.get("email"), str):
+            data["email"] = data["email"].strip().lower()
+        user_emails_cache.invalidate()
+        return super().update(id, data)
+    
+    def delete(self, id: str) -> bool:
+        """Delete a user, evicting cached email lookups."""
+        user_emails_cache.invalidate()
+        return super().delete(id)
+    
+    def get_users_by_role(self, role: str,
+                          projection: Dict[str, Any] = USER_LIST_PROJECTION) -> Iterable[Dict[str, Any]]:
+        """
+        Get all users with a specific role, limited to `projection` fields,
+        as a cursor to iterate once; users arrive USER_BATCH_SIZE at a time
+        instead of being materialized as one list.
+        """
+        return self.find_many_cursor({"role": role}, batch_size=USER_BATCH_SIZE, projection=projection)
+    
+    def get_users_by_project(self, project_id: Union[str, ObjectId],
+                             projection: Dict[str, Any] = USER_LIST_PROJECTION) -> List[Dict[str, Any]]:
+        """
+        Get all users assigned to a project, limited to `projection` fields.
+        Callers looping over projects can pass ObjectIds to skip re-parsing;
+        an invalid id string yields no users.
+        """
+        if not isinstance(project_id, ObjectId):
+            if not ObjectId.is_valid(project_id):
+                return []
+            project_id = ObjectId(project_id)
+        return self.find_many({"project_ids": project_id}, projection=projection)
+    
+    def get_users_by_ids(self, ids: List[str],
+                         projection: Dict[str, Any] = USER_LIST_PROJECTION) -> List[Dict[str, Any]]:
+        """
+        Get several users in one query instead of a find_by_id per user.
+        Invalid ids are skipped; order of the result is unspecified.
+        """
+        object_ids = list({ObjectId(i) for i in ids if ObjectId.is_valid(i)})
+        if not object_ids:
             return []
+        return self.find_many({"_id": {"$in": object_ids}}, projection=projection)
     
     def assign_project(self, user_id: str, project_id: str) -> bool:
         """Assign a project to a user."""
-        try:
-            user = self.find_by_id(user_id)
-            if not user:
-                raise NotFoundError("User", user_id)
-            
-            project_ids = user.get("project_ids", [])
-            project_obj_id = ObjectId(project_id)
-            
-            if project_obj_id not in project_ids:
-                project_ids.append(project_obj_id)
-                return self.update(user_id, {"project_ids": project_ids})
-            
-            return True
-        except Exception as e:
-            logger.error(f"Error assigning project: {str(e)}")
-            return False
+        return self._update_project_ids(user_id, "$addToSet", project_id)
     
     def remove_project(self, user_id: str, project_id: str) -> bool:
         """Remove a project from a user."""
+        return self._update_project_ids(user_id, "$pull", project_id)
+    
+    def _update_project_ids(self, user_id: str, op: str, project_id: str) -> bool:
+        """
+        Apply an atomic $addToSet/$pull of project_id on a user's project_ids.
+        One round trip, and concurrent assignments can't overwrite each other.
+        """
+        user_emails_cache.invalidate()
         try:
-            user = self.find_by_id(user_id)
-            if not user:
-                raise NotFoundError("User", user_id)
-            
-            project_ids = user.get("project_ids", [])
-            project_obj_id = ObjectId(project_id)
-            
-            if project_obj_id in project_ids:
-                project_ids.remove(project_obj_id)
-                return self.update(user_id, {"project_ids": project_ids})
-            
-            return True
-        except Exception as e:
-            logger.error(f"Error removing project: {str(e)}")
+            result = self.db[self.collection_name].update_one(
+                {"_id": ObjectId(user_id)},
+                {op: {"project_ids": ObjectId(project_id)}},
+            )
+        except (InvalidId, TypeError, PyMongoError) as e:
+            logger.error(f"Error updating user projects: {str(e)}")
             return False
-
+        if result.matched_count == 0:
+            logger.error(f"Error updating user projects: User not found: {user_id}")
+            return False
+        return True
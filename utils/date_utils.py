@@ -0,0 +1,42 @@
+"""
+Date helpers for shifts, whose dates are stored as "YYYY-MM-DD" strings.
+"""
+
+from datetime import date, datetime, timedelta
+from functools import lru_cache
+from typing import Optional, Tuple
+
+# Date formats accepted in imported schedules, tried in order
+IMPORT_DATE_FORMATS = ("%Y-%m-%d", "%d/%m/%Y", "%m/%d/%Y", "%d-%m-%Y", "%Y/%m/%d", "%d.%m.%Y")
+
+
+@lru_cache(maxsize=4096)
+def next_day(date_str: str) -> str:
+    """
+    "YYYY-MM-DD" of the day after date_str (used for overnight C shifts).
+    Memoized: the same dates repeat across every member's shifts, so each
+    distinct date is parsed once. Raises ValueError for malformed dates.
+    """
+    return (date.fromisoformat(date_str) + timedelta(days=1)).isoformat()
+
+
+@lru_cache(maxsize=4096)
+def parse_import_date(value: str, formats: Tuple[str, ...] = IMPORT_DATE_FORMATS) -> Optional[str]:
+    """
+    Normalize an imported date string to "YYYY-MM-DD", or None if it matches
+    none of `formats`. ISO dates take the date.fromisoformat fast path;
+    other layouts fall back to strptime. Memoized, since an import repeats
+    the same handful of dates on every row.
+    """
+    value = value.strip()
+    if len(value) == 10 and value[4] == "-" and value[7] == "-":
+        try:
+            return date.fromisoformat(value).isoformat()
+        except ValueError:
+            pass
+    for fmt in formats:
+        try:
+            return datetime.strptime(value, fmt).strftime("%Y-%m-%d")
+        except ValueError:
+            continue
+    return None
@@ -1,40 +1,201 @@
+import queue
 import smtplib
+import threading
+from dataclasses import dataclass
 from email.message import EmailMessage
+from typing import Iterable, Optional
 
 from flask import current_app
 
+# Seconds to wait on the SMTP server before giving up on a connection
+SMTP_TIMEOUT = 30
 
-def send_email(recipient: str, subject: str, body: str) -> bool:
+# One long-lived SMTP session reused across sends, so the TCP + TLS + AUTH
+# handshake is paid once rather than per message. Sends are serialized on
+# the lock; the session is reopened if the settings change or it drops.
+_smtp_lock = threading.Lock()
+_smtp = None
+_smtp_key = None
+
+
+def _open_smtp(server, port, use_tls, username, password):
+    smtp = smtplib.SMTP(server, port, timeout=SMTP_TIMEOUT)
+    if use_tls:
+        smtp.starttls()
+    smtp.login(username, password)
+    return smtp
+
+
+def _close_smtp():
+    """Drop the shared session; callers must hold _smtp_lock."""
+    global _smtp, _smtp_key
+    if _smtp is not None:
+        try:
+            _smtp.quit()
+        except OSError:  # includes SMTPException; the session is gone either way
+            pass
+    _smtp = None
+    _smtp_key = None
+
+
+def _send_message(key, msg, to_addrs=None):
     """
-    Send a plain-text email using SMTP settings from app config.
-    Returns True on success, False otherwise.
+    Send msg over the shared session for the settings in key
+    (server, port, use_tls, username, password), opening it if needed.
+    to_addrs overrides the envelope recipients taken from the headers.
+    A reused session that turns out to be stale is replaced and the send
+    retried once.
     """
-    app = current_app._get_current_object()
-    server = app.config.get("MAIL_SERVER")
-    username = app.config.get("MAIL_USERNAME")
-    password = app.config.get("MAIL_PASSWORD")
-    port = app.config.get("MAIL_PORT", 587)
-    use_tls = app.config.get("MAIL_USE_TLS", True)
-    sender = app.config.get("MAIL_DEFAULT_SENDER") or username
-
-    if not all([server, username, password, sender]):
+    global _smtp, _smtp_key
+    with _smtp_lock:
+        if _smtp is not None and _smtp_key != key:
+            _close_smtp()
+        reused = _smtp is not None
+        if not reused:
+            _smtp = _open_smtp(*key)
+            _smtp_key = key
+        try:
+            _smtp.send_message(msg, to_addrs=to_addrs)
+        except (smtplib.SMTPServerDisconnected, smtplib.SMTPSenderRefused, OSError):
+            _close_smtp()
+            if not reused:
+                raise
+            _smtp = _open_smtp(*key)
+            _smtp_key = key
+            _smtp.send_message(msg, to_addrs=to_addrs)
+
+
+@dataclass(frozen=True)
+class SMTPSettings:
+    """SMTP config snapshot taken once at app init."""
+    server: Optional[str]
+    port: int
+    use_tls: bool
+    username: Optional[str]
+    password: Optional[str]
+    sender: Optional[str]
+
+    @classmethod
+    def from_config(cls, config) -> "SMTPSettings":
+        return cls(
+            server=config.get("MAIL_SERVER"),
+            port=config.get("MAIL_PORT", 587),
+            use_tls=config.get("MAIL_USE_TLS", True),
+            username=config.get("MAIL_USERNAME"),
+            password=config.get("MAIL_PASSWORD"),
+            sender=config.get("MAIL_DEFAULT_SENDER") or config.get("MAIL_USERNAME"),
+        )
+
+    @property
+    def complete(self) -> bool:
+        return all([self.server, self.username, self.password, self.sender])
+
+    @property
+    def key(self) -> tuple:
+        """Connection settings, in _open_smtp argument order."""
+        return (self.server, self.port, self.use_tls, self.username, self.password)
+
+
+def init_email(app) -> None:
+    """Snapshot the app's SMTP settings so sends don't re-read config."""
+    app.extensions["smtp_settings"] = SMTPSettings.from_config(app.config)
+
+
+def _prepare(app, recipient: str, subject: str, body: str):
+    """
+    Build (settings key, message) from the app's SMTP settings, or return
+    None if they are incomplete.
+    """
+    settings = app.extensions.get("smtp_settings")
+    if settings is None:
+        settings = SMTPSettings.from_config(app.config)
+
+    if not settings.complete:
         app.logger.warning("Email not sent: SMTP settings are incomplete.")
-        return False
+        return None
 
     msg = EmailMessage()
     msg["Subject"] = subject
-    msg["From"] = sender
+    msg["From"] = settings.sender
     msg["To"] = recipient
     msg.set_content(body)
+    return settings.key, msg
+
+
+def send_email(recipient: str, subject: str, body: str) -> bool:
+    """
+    Send a plain-text email using SMTP settings from app config.
+    Returns True on success, False otherwise.
+    """
+    app = current_app._get_current_object()
+    prepared = _prepare(app, recipient, subject, body)
+    if prepared is None:
+        return False
 
     try:
-        with smtplib.SMTP(server, port) as smtp:
-            if use_tls:
-                smtp.starttls()
-            smtp.login(username, password)
-            smtp.send_message(msg)
+        _send_message(*prepared)
         return True
     except Exception as exc:  # pragma: no cover - best-effort logging
         app.logger.error("Failed to send email to %s: %s", recipient, exc)
         return False
 
+
+def send_bulk_email(recipients: Iterable[str], subject: str, body: str) -> bool:
+    """
+    Send the same plain-text email to several recipients as a single SMTP
+    transaction (one MAIL FROM, one RCPT TO each, one DATA). Recipients
+    are envelope-only, so they don't see each other's addresses.
+    Returns True on success, False otherwise.
+    """
+    recipients = list(dict.fromkeys(r for r in recipients if r))
+    if not recipients:
+        return True
+
+    app = current_app._get_current_object()
+    prepared = _prepare(app, "undisclosed-recipients:;", subject, body)
+    if prepared is None:
+        return False
+
+    try:
+        _send_message(*prepared, to_addrs=recipients)
+        return True
+    except Exception as exc:  # pragma: no cover - best-effort logging
+        app.logger.error("Failed to send email to %d recipients: %s", len(recipients), exc)
+        return False
+
+
+# Emails waiting for the background sender: (app, recipient, key, msg)
+_outbox = queue.Queue()
+_worker_lock = threading.Lock()
+_worker = None
+
+
+def _drain_outbox():
+    while True:
+        app, recipient, key, msg = _outbox.get()
+        try:
+            _send_message(key, msg)
+        except Exception as exc:  # pragma: no cover - best-effort logging
+            app.logger.error("Failed to send email to %s: %s", recipient, exc)
+        finally:
+            _outbox.task_done()
+
+
+def send_email_async(recipient: str, subject: str, body: str) -> bool:
+    """
+    Queue a plain-text email for a background thread to send, so the
+    request doesn't wait on SMTP. Returns False if the SMTP settings are
+    incomplete; delivery failures after queueing are only logged.
+    """
+    global _worker
+    app = current_app._get_current_object()
+    prepared = _prepare(app, recipient, subject, body)
+    if prepared is None:
+        return False
+
+    with _worker_lock:
+        if _worker is None or not _worker.is_alive():
+            _worker = threading.Thread(target=_drain_outbox, name="email-sender", daemon=True)
+            _worker.start()
+    _outbox.put((app, recipient) + prepared)
+    return True
@@ -0,0 +1,59 @@
+"""
+Image helpers for profile picture uploads.
+"""
+
+import shutil
+from typing import Optional
+
+try:
+    from PIL import Image, UnidentifiedImageError
+    PIL_AVAILABLE = True
+except ImportError:
+    PIL_AVAILABLE = False
+
+# Chunk size used when copying an upload to disk without re-encoding
+COPY_CHUNK_SIZE = 1 << 20  # 1MB
+
+# Leading bytes -> image type, keyed by 3- and 4-byte signatures
+_MAGIC = {
+    b"\xff\xd8\xff": "jpeg",
+    b"\x89PNG": "png",
+    b"GIF8": "gif",
+}
+
+# Image types accepted for profile pictures (re-encoded to JPEG on save)
+ALLOWED_IMAGE_TYPES = {"jpeg", "png", "gif", "webp"}
+
+
+def sniff_image_type(stream) -> Optional[str]:
+    """
+    Identify an image from its first bytes ("jpeg", "png", "gif", "webp").
+    The stream is rewound afterwards. Returns None for unknown content.
+    """
+    head = stream.read(12)
+    stream.seek(0)
+    if head[:4] == b"RIFF" and head[8:12] == b"WEBP":
+        return "webp"
+    return _MAGIC.get(head[:3]) or _MAGIC.get(head[:4])
+
+
+def save_profile_picture(file, filepath: str) -> bool:
+    """
+    Save an uploaded image to filepath as an optimized progressive JPEG.
+    Without Pillow the upload is streamed to disk in 1MB chunks as-is.
+    Returns False if Pillow cannot decode the upload as an image, or if it
+    exceeds Pillow's decompression-bomb pixel limit.
+    """
+    if not PIL_AVAILABLE:
+        with open(filepath, "wb") as dst:
+            shutil.copyfileobj(file.stream, dst, length=COPY_CHUNK_SIZE)
+        return True
+
+    try:
+        with Image.open(file.stream) as img:
+            if img.mode not in ("RGB", "L"):
+                img = img.convert("RGB")
+            img.save(filepath, "JPEG", quality=82, optimize=True, progressive=True)
+    except (UnidentifiedImageError, OSError, Image.DecompressionBombError):
+        return False
+    return True